@@ -0,0 +1,88 @@
+"""
+사전 계산 결과 (artifact) 저장소
+
+장 마감 후 precompute.py 가 계산한 analyze_market_v2 결과를 (시장, 기준일) 단위 JSON 파일로 저장하고,
+UI는 같은 조건의 결과가 있으면 분석을 다시 돌리지 않고 바로 읽어 씁니다.
+결과 형식이나 채점 로직이 바뀌면 ARTIFACT_VERSION 을 올려 이전 결과를 무시하게 합니다.
+"""
+import json
+import os
+from datetime import datetime
+
+from krx_store import STORE_DIR, atomic_write
+from scoring import DEFAULT_SCORING
+from screener import CONSECUTIVE_INVESTORS, MARKETS, MIN_STREAK_INVESTORS, STREAK_DAYS, merge_market_results
+from trading_calendar import get_calendar
+
+ARTIFACT_VERSION = 3
+ARTIFACT_DIR = os.environ.get("KRX_ARTIFACT_DIR", os.path.join(STORE_DIR, "artifacts"))
+
+DEFAULT_PARAMS = {
+    "streak_days": STREAK_DAYS,
+    "streak_investors": list(CONSECUTIVE_INVESTORS),
+    "min_streak_investors": MIN_STREAK_INVESTORS,
+    "scoring": dict(DEFAULT_SCORING._asdict()),
+}
+
+
+def artifact_path(market, date_str):
+    return os.path.join(ARTIFACT_DIR, f"v{ARTIFACT_VERSION}", market, f"{date_str}.json")
+
+def save_artifact(market, data, params=None):
+    """
+    분석 결과(analyze_market_v2 반환값)를 실제 기준일 이름으로 저장하고 경로를 반환
+    """
+    path = artifact_path(market, data["actual_date"])
+    payload = {
+        "version": ARTIFACT_VERSION,
+        "market": market,
+        "actual_date": data["actual_date"],
+        "params": params or DEFAULT_PARAMS,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "results": data["results"],
+    }
+    with atomic_write(path) as tmp_path:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+    return path
+
+def load_artifact(market, date_str, params=None):
+    """
+    기준일(휴장일이면 직전 거래일)의 사전 계산 결과 (없거나 조건이 다르면 None)
+    거래일 확인은 로컬 달력으로만 하며 네트워크 조회는 하지 않습니다.
+    """
+    calendar = get_calendar()
+    if calendar.end is None or date_str > calendar.end:
+        # 달력이 아직 확정하지 않은 날짜는 선택일 그대로 찾음
+        actual_date_str = date_str
+    else:
+        actual_date_str = calendar.session_on_or_before(date_str)
+        if actual_date_str is None:
+            return None
+
+    path = artifact_path(market, actual_date_str)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            payload = json.load(f)
+    except Exception as e:
+        print(f"사전 계산 결과 읽기 실패 ({path}): {e}")
+        return None
+    if payload.get("version") != ARTIFACT_VERSION or payload.get("params") != (params or DEFAULT_PARAMS):
+        return None
+    return payload
+
+def load_all_artifacts(date_str, params=None, markets=MARKETS):
+    """
+    전체 시장(ALL) 결과를 시장별 사전 계산 결과로 조립 (한 시장이라도 없거나 기준일이 다르면 None)
+    """
+    payloads = {market: load_artifact(market, date_str, params) for market in markets}
+    if any(p is None for p in payloads.values()) or len({p["actual_date"] for p in payloads.values()}) != 1:
+        return None
+    return {
+        "actual_date": next(iter(payloads.values()))["actual_date"],
+        "created_at": min(p["created_at"] for p in payloads.values()),
+        "results": merge_market_results({market: p["results"] for market, p in payloads.items()}),
+        "markets": list(markets),
+    }
@@ -0,0 +1,214 @@
+"""
+V2 스코어링 모델 과거 구간 백테스트
+
+analyze_market_v2 를 날짜마다 다시 호출하지 않고, 투자자별 롤링 상태(연속 순매수 일수,
+최근 3일 순매수/등락률)를 하루씩 갱신하면서 매 거래일의 포착 종목과 1/5/20일 후 수익률을 계산합니다.
+거래일 데이터는 다년 패널 저장소(panel_store)에서 읽으며, 저장소에 없는 거래일만 조회해 적재합니다.
+
+사용 예:
+    python backtest.py --market KOSPI KOSDAQ --start 20180101 --end 20241231 --out picks.parquet
+"""
+import argparse
+from collections import deque
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from krx_fetch import FetchExecutor
+from panel_store import get_panel_store
+from scoring import score_market
+from screener import AVERAGE_DAYS, CONSECUTIVE_INVESTORS, INVESTORS, MIN_STREAK_INVESTORS, STREAK_DAYS
+from streaks import StreakCounter, consecutive_sets
+from trading_calendar import get_calendar
+
+HORIZONS = (1, 5, 20)
+OWNERSHIP_LOOKBACK_DAYS = 30
+
+PICK_COLUMNS = ['priority', 'score', 'reasons', 'total_avg', 'is_strict', '평균등락률', '시가총액', '지분변동']
+
+
+class RollingState:
+    """
+    거래일 데이터를 하루씩 받아 갱신하는 투자자별 롤링 상태
+    - 연속 순매수 일수 (StreakCounter)
+    - 최근 N일 투자자별 순매수, 등락률
+    """
+    def __init__(self, window=AVERAGE_DAYS, streak_days=STREAK_DAYS, streak_investors=CONSECUTIVE_INVESTORS,
+                 min_streak_investors=MIN_STREAK_INVESTORS):
+        self.window = window
+        self.streak_days = streak_days
+        self.min_streak_investors = min_streak_investors
+        self.days = deque(maxlen=max(window, streak_days))
+        self.streaks = StreakCounter(streak_investors)
+        self.net = {inv: deque(maxlen=window) for inv in INVESTORS}
+        self.fluc = deque(maxlen=window)
+
+    @property
+    def ready(self):
+        return len(self.days) == self.days.maxlen
+
+    def update(self, date_str, net_purchases, fluctuation):
+        """
+        net_purchases: {투자자: 순매수거래대금 Series (조회 실패 시 None)}, fluctuation: 등락률 Series
+        """
+        self.days.append(date_str)
+        for inv in INVESTORS:
+            self.net[inv].append(net_purchases.get(inv))
+        self.fluc.append(fluctuation)
+
+        # 조회 실패한 주체는 연속 일수를 0으로 초기화
+        streak_nets = {}
+        for inv in self.streaks.investors:
+            net = net_purchases.get(inv)
+            streak_nets[inv] = net if net is not None else pd.Series(dtype='int64')
+        self.streaks.update(streak_nets)
+
+    def consecutive_sets(self):
+        """
+        반환값: (strict_set, relaxed_set, 투자자별 연속 순매수 집합)
+        """
+        return consecutive_sets(self.streaks, self.streak_days, self.min_streak_investors)
+
+    def averages(self):
+        """
+        최근 N일 투자자별 평균 순매수({투자자}_평균)와 평균등락률
+        """
+        columns = {}
+        for inv in INVESTORS:
+            total = pd.Series(dtype='float64')
+            for net in self.net[inv]:
+                if net is not None:
+                    total = total.add(net, fill_value=0)
+            columns[f'{inv}_평균'] = total / self.window
+
+        fluc_sum = pd.Series(dtype='float64')
+        for fluc in self.fluc:
+            if fluc is not None:
+                fluc_sum = fluc_sum.add(fluc, fill_value=0)
+        columns['평균등락률'] = fluc_sum / len(self.fluc)
+        return pd.DataFrame(columns)
+
+
+def _ownership_change(store, date_str, prev_date_str, tickers):
+    """
+    과거 영업일 대비 외국인 지분율 변동폭 (비교일이 없거나 지분율이 없으면 0)
+    """
+    if prev_date_str is None or store.row(prev_date_str) is None:
+        return 0
+    ids = store.ticker_ids(tickers)
+    change = store.values("지분율", date_str)[ids] - store.values("지분율", prev_date_str)[ids]
+    return np.nan_to_num(change)
+
+def _forward_returns(picks, store, horizons):
+    """
+    포착일 종가 대비 N 거래일 후 종가 수익률(%) (패널 저장소 범위 밖이면 NaN)
+    """
+    closes = store.array("종가")
+    ids = store.ticker_ids(picks['ticker'])
+    rows = np.array([store.row(d) for d in picks['date']])
+    base = store.decode("종가", closes[rows, ids])
+    for h in horizons:
+        fwd_rows = rows + h
+        valid = fwd_rows < len(store.dates)
+        fwd = np.full(len(picks), np.nan)
+        fwd[valid] = store.decode("종가", closes[fwd_rows[valid], ids[valid]])
+        picks[f'ret_{h}d'] = (fwd / base - 1) * 100
+    return picks
+
+def run_backtest(market, start_date, end_date, horizons=HORIZONS, executor=None, window=AVERAGE_DAYS,
+                 streak_days=STREAK_DAYS, streak_investors=CONSECUTIVE_INVESTORS):
+    """
+    start_date ~ end_date 의 매 거래일에 V2 스코어링을 적용한 포착 종목과 사후 수익률
+    반환: date, market, ticker, priority, score, ..., ret_{N}d 컬럼의 DataFrame
+    """
+    executor = executor or FetchExecutor()
+    today = datetime.now().strftime("%Y%m%d")
+    # 준비 기간(연속 순매수 창, 30일 전 지분율)까지 포함해 거래일 확보
+    lookback_start = (datetime.strptime(start_date, "%Y%m%d") - timedelta(days=60)).strftime("%Y%m%d")
+    calendar = get_calendar(today, start_date=lookback_start, throttle=executor.limiter.acquire)
+
+    sessions = calendar.sessions_between(start_date, end_date)
+    if not sessions:
+        return pd.DataFrame()
+    warmup = calendar.sessions_up_to(sessions[0], max(window, streak_days))[:-1]
+    days = warmup + sessions
+    prev_days = {d: calendar.session_days_before(d, OWNERSHIP_LOOKBACK_DAYS) for d in sessions}
+
+    # 지분율 비교일부터 사후 수익률 계산용 거래일까지 패널 저장소에 적재 (이미 있는 거래일은 조회 없음)
+    extra_days = calendar.sessions_between(sessions[-1], today)[1:1 + max(horizons)]
+    first_day = min([d for d in prev_days.values() if d is not None] + days[:1])
+    store = get_panel_store(market)
+    store.sync(calendar.sessions_between(first_day, (extra_days or days)[-1]), executor)
+
+    state = RollingState(window, streak_days, streak_investors)
+    investors = list(dict.fromkeys(INVESTORS + list(streak_investors)))
+    picks = []
+
+    for d in days:
+        if store.row(d) is None:
+            print(f"{d} {market} 건너뜀: 패널 저장소에 없는 거래일")
+            continue
+        df = store.day_frame(d)
+        net_purchases = {inv: df[f'{inv}_순매수'] for inv in investors}
+        state.update(d, net_purchases, df['등락률'])
+        if not state.ready or d < start_date:
+            continue
+
+        # 당일 데이터 + 3일 평균 + 지분변동 병합 후 채점
+        df = df.join(state.averages(), how='left').fillna(0)
+        df['지분변동'] = _ownership_change(store, d, prev_days[d], df.index)
+
+        strict_set, relaxed_set, investor_sets = state.consecutive_sets()
+        scored = score_market(
+            df, strict_set, relaxed_set,
+            investor_sets.get('외국인', set()), investor_sets.get('투신', set()), investor_sets.get('연기금', set()),
+        )
+        day_picks = scored[PICK_COLUMNS].rename_axis('ticker').reset_index()
+        day_picks.insert(0, 'market', market)
+        day_picks.insert(0, 'date', d)
+        picks.append(day_picks)
+
+    if not picks:
+        return pd.DataFrame()
+    result = pd.concat(picks, ignore_index=True)
+    return _forward_returns(result, store, horizons)
+
+def summarize(picks, horizons=HORIZONS):
+    """
+    순위별 포착 건수와 평균 사후 수익률
+    """
+    ret_cols = [f'ret_{h}d' for h in horizons]
+    summary = picks.groupby(['market', 'priority'])[ret_cols].mean()
+    summary.insert(0, 'count', picks.groupby(['market', 'priority']).size())
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="수급 분석기 V2 백테스트")
+    parser.add_argument("--market", nargs="+", default=["KOSPI"], choices=["KOSPI", "KOSDAQ"])
+    parser.add_argument("--start", required=True, help="시작일 (YYYYMMDD)")
+    parser.add_argument("--end", default=datetime.now().strftime("%Y%m%d"), help="종료일 (YYYYMMDD)")
+    parser.add_argument("--streak-days", type=int, default=STREAK_DAYS, help="연속 순매수 판정 기간 (거래일)")
+    parser.add_argument("--out", help="결과 파일 (.csv 또는 .parquet)")
+    args = parser.parse_args()
+
+    executor = FetchExecutor()
+    results = [run_backtest(m, args.start, args.end, executor=executor, streak_days=args.streak_days) for m in args.market]
+    results = [r for r in results if not r.empty]
+    if not results:
+        print("포착된 종목이 없습니다.")
+        return
+    picks = pd.concat(results, ignore_index=True)
+
+    print(summarize(picks).to_string())
+    if args.out:
+        if args.out.endswith(".parquet"):
+            picks.to_parquet(args.out, index=False)
+        else:
+            picks.to_csv(args.out, index=False, encoding="utf-8-sig")
+        print(f"저장 완료: {args.out} ({len(picks)}건)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+수급 분석기 V2 배치 실행 (Streamlit 없이 실행)
+
+날짜 x 시장 조합을 프로세스 풀에서 나누어 분석하고 결과를 CSV/Parquet/JSON 파일로 저장합니다.
+
+사용 예:
+    python batch.py --dates 20240102 20240103 --markets KOSPI KOSDAQ --format parquet --out results
+    python batch.py --start 20240101 --end 20240131 --workers 4
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+from krx_fetch import DEFAULT_RATE_LIMIT, FetchExecutor
+from ownership import backfill_ownership
+from result_history import record_results
+from screener import STREAK_DAYS, analyze_market_v2, results_to_frame
+from trading_calendar import get_calendar
+
+FORMATS = ["csv", "parquet", "json"]
+
+
+def configure_logging():
+    """
+    실행 지표 JSON 로그(krx.metrics)를 한 줄씩 출력 (프로세스 풀 작업자마다 호출)
+    """
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+def run_job(market, date_str, requests_per_second, streak_days=STREAK_DAYS):
+    """
+    (시장, 기준일) 1건 분석 - 프로세스 풀 작업 단위
+    """
+    start = time.perf_counter()
+    executor = FetchExecutor(requests_per_second=requests_per_second)
+    data = analyze_market_v2(market, date_str, executor=executor, streak_days=streak_days)
+    data["market"] = market
+    data["requested_date"] = date_str
+    data["elapsed"] = time.perf_counter() - start
+    return data
+
+def write_result(data, out_dir, fmt):
+    """
+    분석 결과를 {기준일}_{시장}.{형식} 파일로 저장하고 경로를 반환
+    """
+    path = os.path.join(out_dir, f"{data['actual_date']}_{data['market']}.{fmt}")
+    if fmt == "json":
+        payload = {k: data[k] for k in ("market", "requested_date", "actual_date", "results")}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+        return path
+
+    df = results_to_frame(data["results"])
+    df.insert(0, "market", data["market"])
+    df.insert(0, "date", data["actual_date"])
+    if fmt == "parquet":
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False, encoding="utf-8-sig")
+    return path
+
+def resolve_dates(args):
+    if args.dates:
+        return args.dates
+    end = args.end or (datetime.now() - timedelta(days=1)).strftime("%Y%m%d")
+    return get_calendar(end, start_date=args.start).sessions_between(args.start, end)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="수급 분석기 V2 배치 실행")
+    parser.add_argument("--dates", nargs="+", help="분석 기준일 목록 (YYYYMMDD)")
+    parser.add_argument("--start", help="기간 시작일 (YYYYMMDD, --dates 대신 사용)")
+    parser.add_argument("--end", help="기간 종료일 (YYYYMMDD, 기본값: 어제)")
+    parser.add_argument("--markets", nargs="+", default=["KOSPI", "KOSDAQ"], choices=["KOSPI", "KOSDAQ"])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="프로세스 수")
+    parser.add_argument("--rps", type=float, default=DEFAULT_RATE_LIMIT, help="전체 초당 요청 수 제한")
+    parser.add_argument("--streak-days", type=int, default=STREAK_DAYS, help="연속 순매수 판정 기간 (거래일)")
+    parser.add_argument("--format", default="csv", choices=FORMATS)
+    parser.add_argument("--out", default="results", help="결과 저장 폴더")
+    args = parser.parse_args()
+    configure_logging()
+
+    if not args.dates and not args.start:
+        parser.error("--dates 또는 --start 중 하나는 지정해야 합니다.")
+
+    # 거래일 달력은 작업 분배 전에 한 번만 갱신 (각 프로세스는 로컬 달력만 읽음)
+    dates = resolve_dates(args)
+    get_calendar(max(dates))
+    jobs = [(market, d) for d in dates for market in args.markets]
+    if not jobs:
+        print("분석할 거래일이 없습니다.")
+        return
+
+    # 지분율 이력도 작업 분배 전에 전체 기간을 한 번에 적재 (각 작업은 적재된 이력을 읽기만 함)
+    executor = FetchExecutor(requests_per_second=args.rps)
+    for market in args.markets:
+        backfill_ownership(market, max(dates), min(dates), executor)
+
+    os.makedirs(args.out, exist_ok=True)
+    workers = max(1, min(args.workers, len(jobs)))
+    # 프로세스마다 요청 수 제한이 따로 적용되므로 전체 한도를 나누어 배분
+    rps_per_worker = args.rps / workers if args.rps > 0 else 0
+
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=configure_logging) as pool:
+        futures = {pool.submit(run_job, market, d, rps_per_worker, args.streak_days): (market, d) for market, d in jobs}
+        for future in as_completed(futures):
+            market, d = futures[future]
+            try:
+                data = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"[실패] {d} {market}: {e}")
+                continue
+            if "error" in data:
+                failed += 1
+                print(f"[실패] {d} {market}: {data['error']}")
+                continue
+            path = write_result(data, args.out, args.format)
+            # 기본 조건 결과는 결과 이력에도 기록 (기록은 메인 프로세스에서만)
+            if args.streak_days == STREAK_DAYS:
+                record_results(market, data)
+            print(f"[완료] {d} {market}: {len(data['results'])}종목, {data['elapsed']:.1f}초 -> {path}")
+
+    print(f"총 {len(jobs)}건 중 {len(jobs) - failed}건 완료")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
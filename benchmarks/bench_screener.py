@@ -0,0 +1,165 @@
+"""
+analyze_market_v2 성능 벤치마크 (기록된 픽스처 재생, 네트워크 없음)
+
+케이스(시장:기준일)마다 빈 저장소(cold)와 채워진 저장소(warm)에서 단계별 소요 시간과
+데이터 소스 호출 수를 측정하고, 기준값(baseline.json)보다 나빠지면 실패(종료 코드 1)합니다.
+픽스처나 기준값이 없어도 검사를 건너뛰지 않고 실패합니다.
+
+사용 예 (저장소 루트에서):
+    python -m benchmarks.bench_screener --record --cases KOSPI:20240105 KOSDAQ:20240105   # 픽스처 기록 (네트워크 필요)
+    python -m benchmarks.bench_screener --update-baseline                                  # 기준값 갱신
+    python -m benchmarks.bench_screener                                                     # 회귀 검사
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+# 저장소 경로와 요청 수 제한은 모듈 import 시점에 정해지므로 import 전에 지정
+# (재생 시에는 네트워크가 없으므로 요청 수 제한을 끄고 코드 자체의 시간만 측정)
+BENCH_STORE_DIR = tempfile.mkdtemp(prefix="krx_bench_")
+os.environ["KRX_STORE_DIR"] = BENCH_STORE_DIR
+if "--record" not in sys.argv:
+    os.environ["KRX_FETCH_RPS"] = "0"
+
+import datasource  # noqa: E402
+import ticker_master  # noqa: E402
+import trading_calendar  # noqa: E402
+from screener import analyze_market_v2  # noqa: E402
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+CASES_FILE = "cases.json"
+
+
+def reset_store():
+    """
+    저장소와 프로세스 내 캐시를 비워 cold 상태로 되돌림
+    """
+    shutil.rmtree(BENCH_STORE_DIR, ignore_errors=True)
+    os.makedirs(BENCH_STORE_DIR, exist_ok=True)
+    ticker_master.clear_cache()
+    trading_calendar.reset_calendar()
+
+def measure(market, date_str, source):
+    """
+    1회 실행의 단계별 소요 시간(초)과 데이터 소스 호출 수 (analyze_market_v2 실행 지표 사용)
+    """
+    source.reset_calls()
+    data = analyze_market_v2(market, date_str)
+    if "error" in data:
+        raise RuntimeError(f"{market} {date_str}: {data['error']}")
+    metrics = data["metrics"]
+    return {"total": metrics["total_seconds"], "calls": source.total_calls(), "stages": metrics["stages"]}
+
+def run_case(market, date_str, source, repeat):
+    """
+    cold/warm 각각 repeat 회 실행해 가장 빠른 기록을 사용
+    """
+    result = {}
+    for mode in ("cold", "warm"):
+        runs = []
+        for _ in range(repeat):
+            if mode == "cold":
+                reset_store()
+            runs.append(measure(market, date_str, source))
+        result[mode] = min(runs, key=lambda r: r["total"])
+    return result
+
+def check(results, baseline, tolerance, slack):
+    """
+    기준값 대비 회귀 목록 (호출 수 증가, 또는 시간이 기준 x tolerance + slack 초과)
+    """
+    regressions = []
+    for case, modes in results.items():
+        for mode, current in modes.items():
+            base = baseline.get(case, {}).get(mode)
+            if base is None:
+                regressions.append(f"{case} [{mode}] 기준값 없음 (--update-baseline 으로 갱신 필요)")
+                continue
+            if current["calls"] > base["calls"]:
+                regressions.append(f"{case} [{mode}] 호출 수 {base['calls']} -> {current['calls']}")
+            timings = [("total", base["total"], current["total"])]
+            timings += [(f"stage '{s}'", t, current["stages"].get(s, 0.0)) for s, t in base["stages"].items()]
+            for label, base_t, cur_t in timings:
+                if cur_t > base_t * tolerance + slack:
+                    regressions.append(f"{case} [{mode}] {label} {base_t:.3f}s -> {cur_t:.3f}s")
+    return regressions
+
+def print_results(results):
+    for case, modes in results.items():
+        for mode, r in modes.items():
+            stages = ", ".join(f"{s} {t:.3f}s" for s, t in r["stages"].items())
+            print(f"{case:<18} {mode:<5} {r['total']:7.3f}s  호출 {r['calls']:4d}회  ({stages})")
+
+def load_cases(args):
+    if args.cases:
+        return args.cases
+    path = os.path.join(args.fixtures, CASES_FILE)
+    if not os.path.exists(path):
+        raise SystemExit(f"케이스가 없습니다. --cases 를 지정하거나 먼저 --record 로 픽스처를 기록하세요. ({path})")
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="수급 분석기 V2 벤치마크")
+    parser.add_argument("--cases", nargs="+", help="시장:기준일 목록 (예: KOSPI:20240105)")
+    parser.add_argument("--fixtures", default=datasource.DEFAULT_FIXTURE_DIR, help="픽스처 폴더")
+    parser.add_argument("--record", action="store_true", help="실제 pykrx 응답을 픽스처로 기록")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=1.5, help="허용 시간 배수")
+    parser.add_argument("--slack", type=float, default=0.05, help="허용 시간 여유 (초)")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    cases = load_cases(args)
+    if not args.record and not os.path.isdir(args.fixtures):
+        raise SystemExit(f"픽스처 폴더가 없습니다. 먼저 --record 로 기록하세요. ({args.fixtures})")
+    if args.record:
+        source = datasource.RecordingSource(datasource.PykrxSource(), args.fixtures)
+    else:
+        source = datasource.ReplaySource(args.fixtures)
+    datasource.set_source(source)
+
+    try:
+        results = {}
+        for case in cases:
+            market, date_str = case.split(":")
+            results[case] = run_case(market, date_str, source, 1 if args.record else args.repeat)
+    finally:
+        shutil.rmtree(BENCH_STORE_DIR, ignore_errors=True)
+
+    print_results(results)
+
+    if args.record:
+        with open(os.path.join(args.fixtures, CASES_FILE), "w", encoding="utf-8") as f:
+            json.dump(cases, f, indent=1)
+        print(f"픽스처 기록 완료: {args.fixtures}")
+        return
+
+    if args.update_baseline:
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=1)
+        print(f"기준값 저장: {BASELINE_PATH}")
+        return
+
+    if not os.path.exists(BASELINE_PATH):
+        # 기준값 없이 통과하면 회귀 검사가 의미 없으므로 실패 처리
+        print("기준값이 없습니다. --update-baseline 으로 먼저 생성하세요.")
+        sys.exit(1)
+    with open(BASELINE_PATH, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = check(results, baseline, args.tolerance, args.slack)
+    if regressions:
+        print("\n성능 회귀:")
+        for line in regressions:
+            print(f"  - {line}")
+        sys.exit(1)
+    print("\n회귀 없음")
+
+
+if __name__ == "__main__":
+    main()
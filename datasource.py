@@ -0,0 +1,220 @@
+"""
+KRX 데이터 소스
+
+모든 pykrx 조회는 이 모듈의 데이터 소스를 거칩니다.
+- PykrxSource: 실제 pykrx 조회
+- RecordingSource: 내부 소스의 응답을 디스크에 기록 (재생용 픽스처 생성)
+- ReplaySource: 기록된 픽스처만으로 응답 (네트워크 없음)
+
+기본 소스는 환경 변수 KRX_SOURCE(pykrx/record/replay)와 KRX_FIXTURE_DIR 로 정합니다.
+"""
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from collections import Counter
+
+import pandas as pd
+
+from instrumentation import record_call
+
+DEFAULT_FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks", "fixtures")
+
+# 데이터 소스가 제공하는 조회 목록 (ticker_master 외에는 pykrx.stock 함수명과 동일)
+METHODS = (
+    "get_market_cap",
+    "get_market_ohlcv",
+    "get_market_ohlcv_by_date",
+    "get_market_net_purchases_of_equities_by_ticker",
+    "get_market_program_net_purchases_of_equities_by_ticker",
+    "get_exhaustion_rates_of_foreign_investment_by_ticker",
+    "get_market_ticker_name",
+    "ticker_master",
+)
+
+
+class FixtureMissing(KeyError):
+    """
+    재생 모드에서 기록되지 않은 조회를 요청한 경우
+    """
+
+
+class DataSource:
+    """
+    데이터 소스 공통 부분 - 조회 횟수를 조회 종류별로 세고, 호출별 소요 시간을 실행 지표에 기록합니다.
+    """
+    def __init__(self):
+        self.calls = Counter()
+        self._calls_lock = threading.Lock()
+
+    def call(self, method, *args):
+        if method not in METHODS:
+            raise ValueError(f"지원하지 않는 조회: {method}")
+        with self._calls_lock:
+            self.calls[method] += 1
+        start = time.perf_counter()
+        ok = False
+        try:
+            result = self._call(method, args)
+            ok = True
+            return result
+        finally:
+            record_call(method, args, time.perf_counter() - start, ok)
+
+    def _call(self, method, args):
+        raise NotImplementedError
+
+    def total_calls(self):
+        return sum(self.calls.values())
+
+    def reset_calls(self):
+        with self._calls_lock:
+            self.calls.clear()
+
+
+class PykrxSource(DataSource):
+    """
+    실제 pykrx 조회
+    """
+    def _call(self, method, args):
+        from pykrx import stock
+
+        if method == "ticker_master":
+            return _fetch_ticker_master()
+        if method in ("get_market_cap", "get_market_ohlcv"):
+            date_str, market = args
+            return getattr(stock, method)(date_str, market=market)
+        return getattr(stock, method)(*args)
+
+
+def _fetch_ticker_master():
+    """
+    상장/상장폐지 종목 목록과 상장일 일괄 조회 (호출 3회)
+    종목명은 stock.get_market_ticker_name 과 같은 규칙(상장 종목 우선, 상장폐지 중복은 ISIN 순 첫 번째)을 따릅니다.
+    """
+    from pykrx.website.krx.market.core import 상장종목검색, 상폐종목검색, 전종목기본정보
+
+    market_codes = {"코스피": "STK", "코스닥": "KSQ", "코넥스": "KNX"}
+
+    def fetch_finder(finder):
+        df = finder().fetch("ALL")
+        df = df[["short_code", "codeName", "full_code", "marketName"]]
+        df.columns = ["티커", "종목", "ISIN", "시장"]
+        df["시장"] = df["시장"].replace("유가증권", "코스피").map(market_codes)
+        return df
+
+    listed = fetch_finder(상장종목검색).assign(상장폐지=False)
+    delisted = fetch_finder(상폐종목검색).sort_values("ISIN", kind="stable").assign(상장폐지=True)
+    delisted = delisted[~delisted["티커"].isin(listed["티커"])]
+
+    master = pd.concat([listed, delisted]).drop_duplicates("티커").set_index("티커")
+
+    # 상장일 (현재 상장 종목만 제공됨)
+    info = 전종목기본정보().fetch("ALL")
+    listing_dates = info.set_index("ISU_SRT_CD")["LIST_DD"].str.replace("/", "")
+    master["상장일"] = listing_dates.reindex(master.index)
+    return master
+
+
+def fixture_key(method, args):
+    return hashlib.sha1(json.dumps([method, list(args)], ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def fixture_path(root, method, args):
+    return os.path.join(root, method, f"{fixture_key(method, args)}.pkl")
+
+
+class RecordingSource(DataSource):
+    """
+    내부 소스의 응답(예외 포함)을 root 아래에 기록하는 프록시
+    """
+    def __init__(self, inner, root=DEFAULT_FIXTURE_DIR):
+        super().__init__()
+        self.inner = inner
+        self.root = root
+        self._index_lock = threading.Lock()
+
+    def _call(self, method, args):
+        try:
+            # 지표/호출 수가 두 번 기록되지 않도록 내부 소스의 _call 을 직접 사용
+            result = self.inner._call(method, args)
+        except Exception as e:
+            self._record(method, args, ("error", e))
+            raise
+        self._record(method, args, ("ok", result))
+        return result
+
+    def _record(self, method, args, payload):
+        from krx_store import atomic_write  # krx_store 가 이 모듈을 import 하므로 사용 시점에 import
+
+        path = fixture_path(self.root, method, args)
+        with atomic_write(path) as tmp_path:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(payload, f)
+
+        # 사람이 읽을 수 있는 색인 (키 -> 조회 내용)
+        with self._index_lock:
+            index_path = os.path.join(self.root, "index.json")
+            index = {}
+            if os.path.exists(index_path):
+                with open(index_path, encoding="utf-8") as f:
+                    index = json.load(f)
+            index[fixture_key(method, args)] = [method, list(args)]
+            with open(index_path, "w", encoding="utf-8") as f:
+                json.dump(index, f, ensure_ascii=False, indent=1, sort_keys=True)
+
+
+class ReplaySource(DataSource):
+    """
+    기록된 픽스처로만 응답 (기록되지 않은 조회는 FixtureMissing)
+    """
+    def __init__(self, root=DEFAULT_FIXTURE_DIR):
+        super().__init__()
+        self.root = root
+
+    def _call(self, method, args):
+        path = fixture_path(self.root, method, args)
+        if not os.path.exists(path):
+            raise FixtureMissing(f"픽스처 없음: {method}{tuple(args)}")
+        with open(path, "rb") as f:
+            status, value = pickle.load(f)
+        if status == "error":
+            raise value
+        return value
+
+
+_source = None
+_source_lock = threading.Lock()
+
+
+def _default_source():
+    mode = os.environ.get("KRX_SOURCE", "pykrx")
+    root = os.environ.get("KRX_FIXTURE_DIR", DEFAULT_FIXTURE_DIR)
+    if mode == "replay":
+        return ReplaySource(root)
+    if mode == "record":
+        return RecordingSource(PykrxSource(), root)
+    return PykrxSource()
+
+def get_source():
+    global _source
+    with _source_lock:
+        if _source is None:
+            _source = _default_source()
+        return _source
+
+def set_source(source):
+    """
+    프로세스 공용 데이터 소스 교체 (이전 소스 반환)
+    """
+    global _source
+    with _source_lock:
+        previous, _source = _source, source
+        return previous
+
+def fetch(method, *args):
+    """
+    현재 데이터 소스로 조회
+    """
+    return get_source().call(method, *args)
@@ -0,0 +1,144 @@
+"""
+실행 지표 수집
+
+분석 1회(run) 동안의 단계별 소요 시간, 데이터 소스 호출 횟수/지연, 저장소 캐시 적중,
+조회 실패로 0/빈 값 처리된 데이터(fallback)를 모읍니다. 지표 객체는 contextvars 로 전달되므로
+FetchExecutor 작업 스레드에서도 같은 run 에 기록됩니다.
+"""
+import contextvars
+import json
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+logger = logging.getLogger("krx.metrics")
+
+_current = contextvars.ContextVar("run_metrics", default=None)
+_stage_prefix = contextvars.ContextVar("stage_prefix", default="")
+
+
+class RunMetrics:
+    def __init__(self, **labels):
+        self.labels = labels
+        self.started = time.perf_counter()
+        self.finished = None
+        self.stages = {}
+        self.calls = []
+        self.cache = defaultdict(Counter)
+        self.fallbacks = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.stages[name] = self.stages.get(name, 0.0) + elapsed
+
+    def record_call(self, method, args, elapsed, ok):
+        with self._lock:
+            self.calls.append({"method": method, "args": [str(a) for a in args], "elapsed": elapsed, "ok": ok})
+
+    def record_cache(self, dataset, hit):
+        with self._lock:
+            self.cache[dataset]["hit" if hit else "miss"] += 1
+
+    def record_fallback(self, name, reason):
+        with self._lock:
+            self.fallbacks.append({"name": name, "reason": str(reason)})
+
+    def finish(self, **labels):
+        self.labels.update(labels)
+        self.finished = time.perf_counter()
+
+    def summary(self, slowest=10):
+        """
+        JSON 직렬화 가능한 요약
+        """
+        with self._lock:
+            calls = list(self.calls)
+            by_method = {}
+            for c in calls:
+                m = by_method.setdefault(c["method"], {"count": 0, "errors": 0, "total": 0.0, "max": 0.0})
+                m["count"] += 1
+                m["errors"] += 0 if c["ok"] else 1
+                m["total"] += c["elapsed"]
+                m["max"] = max(m["max"], c["elapsed"])
+            end = self.finished if self.finished is not None else time.perf_counter()
+            return {
+                **self.labels,
+                "total_seconds": end - self.started,
+                "stages": dict(self.stages),
+                "calls": {
+                    "count": len(calls),
+                    "errors": sum(1 for c in calls if not c["ok"]),
+                    "total_seconds": sum(c["elapsed"] for c in calls),
+                    "by_method": by_method,
+                    "slowest": sorted(calls, key=lambda c: -c["elapsed"])[:slowest],
+                },
+                "cache": {name: dict(counts) for name, counts in self.cache.items()},
+                "fallbacks": list(self.fallbacks),
+            }
+
+    def log(self):
+        logger.info(json.dumps({"event": "run_metrics", **self.summary()}, ensure_ascii=False))
+
+
+@contextmanager
+def activate(metrics):
+    """
+    with 블록 안의 기록을 metrics 로 보냄
+    """
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+def current():
+    return _current.get()
+
+@contextmanager
+def stage_prefix(prefix):
+    """
+    with 블록 안의 단계 이름을 '{prefix}:{단계}' 로 기록 (여러 시장을 동시에 분석할 때 시장별로 나누어 기록)
+    """
+    token = _stage_prefix.set(f"{prefix}:")
+    try:
+        yield
+    finally:
+        _stage_prefix.reset(token)
+
+@contextmanager
+def stage(name):
+    metrics = current()
+    if metrics is None:
+        yield
+        return
+    with metrics.stage(_stage_prefix.get() + name):
+        yield
+
+def record_call(method, args, elapsed, ok):
+    metrics = current()
+    if metrics is not None:
+        metrics.record_call(method, args, elapsed, ok)
+
+def record_cache(dataset, hit):
+    metrics = current()
+    if metrics is not None:
+        metrics.record_cache(dataset, hit)
+
+def record_fallback(name, reason):
+    """
+    조회 실패로 0/빈 값으로 대체한 데이터 기록 (지표 수집 중이 아니면 콘솔 출력)
+    """
+    metrics = current()
+    if metrics is not None:
+        metrics.record_fallback(name, reason)
+    else:
+        print(f"{name} 대체 처리: {reason}")
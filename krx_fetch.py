@@ -0,0 +1,122 @@
+"""
+pykrx 동시 조회 실행기
+
+서로 의존하지 않는 pykrx 호출들을 한 번에 모아 제한된 스레드 풀에서 실행합니다.
+초당 요청 수 제한, 재시도(지수 백오프), 호출별 소요 시간 기록을 제공합니다.
+"""
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from krx_store import load_snapshot
+
+DEFAULT_MAX_WORKERS = int(os.environ.get("KRX_FETCH_WORKERS", "8"))
+DEFAULT_RATE_LIMIT = float(os.environ.get("KRX_FETCH_RPS", "10"))  # 초당 요청 수 (0 이하면 제한 없음)
+
+
+class RateLimiter:
+    """
+    초당 요청 수 제한 (요청 간 최소 간격을 스레드 간에 공유)
+    """
+    def __init__(self, requests_per_second):
+        self.interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def acquire(self):
+        if self.interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+class FetchStat:
+    """
+    호출 1건의 실행 기록
+    """
+    __slots__ = ("key", "elapsed", "attempts", "ok")
+
+    def __init__(self, key, elapsed, attempts, ok):
+        self.key = key
+        self.elapsed = elapsed
+        self.attempts = attempts
+        self.ok = ok
+
+    def to_dict(self):
+        return {"key": self.key, "elapsed": self.elapsed, "attempts": self.attempts, "ok": self.ok}
+
+
+class FetchExecutor:
+    """
+    작업 묶음을 스레드 풀에서 실행하고 키별 결과를 돌려줍니다.
+    실패한 작업은 재시도 후에도 실패하면 결과 자리에 예외 객체가 들어갑니다.
+    """
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, requests_per_second=DEFAULT_RATE_LIMIT,
+                 max_retries=2, backoff=0.5):
+        self.max_workers = max_workers
+        self.limiter = RateLimiter(requests_per_second)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.stats = []
+        self._stats_lock = threading.Lock()
+
+    def _call(self, key, func):
+        start = time.perf_counter()
+        attempts = 0
+        while True:
+            attempts += 1
+            try:
+                result = func()
+                ok = True
+                break
+            except Exception as e:
+                if attempts > self.max_retries:
+                    result = e
+                    ok = False
+                    break
+                time.sleep(self.backoff * (2 ** (attempts - 1)))
+
+        with self._stats_lock:
+            self.stats.append(FetchStat(key, time.perf_counter() - start, attempts, ok))
+        return result
+
+    def run(self, tasks):
+        """
+        tasks: {키: 인자 없는 함수} -> {키: 결과 또는 예외}
+        작업은 호출한 쪽의 컨텍스트(실행 지표 등) 사본 안에서 실행됩니다.
+        """
+        if not tasks:
+            return {}
+        workers = max(1, min(self.max_workers, len(tasks)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                key: pool.submit(contextvars.copy_context().run, self._call, key, func)
+                for key, func in tasks.items()
+            }
+            return {key: future.result() for key, future in futures.items()}
+
+    def snapshot_task(self, key):
+        """
+        (데이터셋, 날짜, 시장, 투자자) 키를 저장소 경유로 조회하는 작업
+        초당 요청 수 제한은 실제 네트워크 호출에만 적용됩니다.
+        """
+        return partial(load_snapshot, *key, throttle=self.limiter.acquire)
+
+    def fetch_snapshots(self, keys):
+        """
+        스냅샷 키 목록을 동시에 조회합니다 (중복 키는 한 번만 조회).
+        """
+        return self.run({key: self.snapshot_task(key) for key in keys})
+
+    def latency_report(self):
+        """
+        호출별 소요 시간 (느린 순)
+        """
+        return [s.to_dict() for s in sorted(self.stats, key=lambda s: -s.elapsed)]
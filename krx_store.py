@@ -0,0 +1,137 @@
+"""
+KRX 일별 스냅샷 로컬 저장소
+
+지나간 영업일의 데이터는 바뀌지 않으므로 pykrx 응답을 (날짜, 시장, 데이터셋, 투자자) 단위의
+Parquet 파일로 저장해 두고 재사용합니다. 저장소에 없는 데이터나 당일 데이터만 네트워크를 탑니다.
+"""
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+from datasource import fetch
+from instrumentation import record_cache
+
+STORE_DIR = os.environ.get(
+    "KRX_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".krx_store"),
+)
+
+# -----------------------------------------------------------------------------
+# 데이터셋별 조회 함수 (datasource 경유)
+# -----------------------------------------------------------------------------
+# date_str 은 단일 영업일(YYYYMMDD) 또는 기간(YYYYMMDD-YYYYMMDD) 형식입니다.
+
+def _split_period(date_str):
+    if "-" in date_str:
+        start, end = date_str.split("-", 1)
+        return start, end
+    return date_str, date_str
+
+def _fetch_cap(date_str, market, investor):
+    return fetch("get_market_cap", date_str, market)
+
+def _fetch_ohlcv(date_str, market, investor):
+    return fetch("get_market_ohlcv", date_str, market)
+
+def _fetch_net_purchase(date_str, market, investor):
+    start, end = _split_period(date_str)
+    return fetch("get_market_net_purchases_of_equities_by_ticker", start, end, market, investor)
+
+def _fetch_program(date_str, market, investor):
+    start, end = _split_period(date_str)
+    return fetch("get_market_program_net_purchases_of_equities_by_ticker", start, end, market)
+
+def _fetch_foreign(date_str, market, investor):
+    return fetch("get_exhaustion_rates_of_foreign_investment_by_ticker", date_str, market)
+
+FETCHERS = {
+    "cap": _fetch_cap,                    # 시가총액
+    "ohlcv": _fetch_ohlcv,                # 시세 (등락률)
+    "net_purchase": _fetch_net_purchase,  # 투자자별 순매수
+    "program": _fetch_program,            # 프로그램 매매 순매수
+    "foreign": _fetch_foreign,            # 외국인 지분율
+}
+
+# -----------------------------------------------------------------------------
+# 저장소
+# -----------------------------------------------------------------------------
+
+def snapshot_path(dataset, date_str, market, investor=None):
+    """
+    (날짜, 시장, 데이터셋, 투자자) 키에 해당하는 Parquet 파일 경로
+    """
+    file_name = date_str if investor is None else f"{date_str}_{investor}"
+    return os.path.join(STORE_DIR, dataset, market, f"{file_name}.parquet")
+
+def is_final(date_str):
+    """
+    기준일(기간이면 종료일)이 오늘 이전이면 더 이상 바뀌지 않는 데이터로 간주
+    """
+    _, end = _split_period(date_str)
+    return end < datetime.now().strftime("%Y%m%d")
+
+def read_frame(path):
+    """
+    Parquet 파일 읽기 (실패 시 None)
+    """
+    try:
+        return pd.read_parquet(path)
+    except Exception as e:
+        # 손상된 파일은 지우고 다시 받음
+        print(f"스냅샷 읽기 실패 ({path}): {e}")
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return None
+
+@contextmanager
+def atomic_write(path, suffix=".tmp"):
+    """
+    path 를 교체할 임시 파일 경로를 돌려줍니다. with 블록이 끝나면 path 로 교체하고, 예외 시 임시 파일을 지웁니다.
+    여러 프로세스/스레드가 같은 파일을 써도 읽는 쪽은 항상 완성된 파일만 봅니다.
+    suffix: 쓰는 쪽이 확장자를 요구할 때 (예: np.savez 는 .npz)
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}{suffix}"
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def write_frame(path, df):
+    """
+    Parquet 파일 쓰기 (임시 파일에 쓴 뒤 교체)
+    """
+    try:
+        with atomic_write(path) as tmp_path:
+            df.to_parquet(tmp_path)
+    except Exception as e:
+        print(f"스냅샷 저장 실패 ({path}): {e}")
+
+def load_snapshot(dataset, date_str, market, investor=None, throttle=None):
+    """
+    저장소에 있으면 디스크에서 읽고, 없으면 pykrx로 조회한 뒤 저장합니다 (read-through).
+    당일 데이터와 빈 응답(휴장일 등)은 저장하지 않습니다. 조회 실패 시 예외를 그대로 전달합니다.
+    throttle 이 주어지면 네트워크 조회 직전에 호출합니다 (요청 속도 제한용).
+    """
+    path = snapshot_path(dataset, date_str, market, investor)
+    if os.path.exists(path):
+        df = read_frame(path)
+        if df is not None:
+            record_cache(dataset, hit=True)
+            return df
+
+    record_cache(dataset, hit=False)
+    if throttle is not None:
+        throttle()
+    df = FETCHERS[dataset](date_str, market, investor)
+    if is_final(date_str) and df is not None and not df.empty:
+        write_frame(path, df)
+    return df
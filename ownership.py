@@ -0,0 +1,203 @@
+"""
+외국인 지분율 이력과 기간별 변동
+
+시장별 지분율을 (거래일 x 종목) 배열로 로컬에 쌓아 두고(거래일당 조회 1건, 지난 거래일만 추가),
+5/20/60/120 거래일 변동과 추세 기울기를 배열 연산으로 한 번에 계산합니다.
+
+화면 분석은 이력이 최근 며칠만 밀린 경우에만 이어서 적재하고, 비어 있거나 오래 밀렸으면
+변동 계산 기준 거래일만 조회합니다. 전체 이력 적재는 precompute / batch 또는 아래 명령으로 합니다.
+
+사용 예:
+    python ownership.py --market KOSPI KOSDAQ --end 20241231   # 기준일까지 변동 계산에 필요한 이력 적재
+"""
+import argparse
+import os
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import record_fallback
+from krx_store import STORE_DIR
+from krx_fetch import FetchExecutor
+from panel import get_frame
+from panel_store import FIELDS, PanelStore
+from trading_calendar import get_calendar
+
+OWNERSHIP_WINDOWS = (5, 20, 60, 120)  # 지분율 변동 계산 기간 (거래일)
+SLOPE_DAYS = 20  # 추세 기울기 계산 기간 (거래일, 기준일 포함)
+TREND_COLUMN = '지분추세'  # 이력이 부족하면 0 대신 비워 두는 컬럼
+SYNC_LIMIT = int(os.environ.get("KRX_OWNERSHIP_SYNC_DAYS", "5"))  # 분석 중 이어서 적재할 최대 거래일 수
+
+
+class OwnershipHistory(PanelStore):
+    """
+    외국인 지분율 이력 (지분율 필드만 저장)
+    """
+    fields = {"지분율": FIELDS["지분율"]}
+    listed_field = "지분율"
+
+    def __init__(self, market, root=None):
+        super().__init__(market, root or os.path.join(STORE_DIR, "ownership", market))
+
+    def day_keys(self, date_str):
+        return [("foreign", date_str, self.market, None)]
+
+    def day_fields(self, date_str, frames):
+        try:
+            df = get_frame(frames, ("foreign", date_str, self.market, None))[["지분율"]]
+        except Exception as e:
+            return None, f"지분율 조회 실패: {e}"
+        if df.empty:
+            return None, "지분율 데이터 없음"
+        return df, None
+
+    def matrix(self, sessions, tickers):
+        """
+        sessions x tickers 지분율 배열 (float64, 저장되지 않은 거래일/종목은 NaN)
+        """
+        out = np.full((len(sessions), len(tickers)), np.nan)
+        with self._locked():
+            ids = self.ticker_ids(tickers)
+            rows = [self.row(d) for d in sessions]
+            have = np.array([i for i, r in enumerate(rows) if r is not None], dtype=np.int64)
+            known = np.flatnonzero(ids >= 0)
+            if len(have) and len(known):
+                stored = self.array("지분율")[[rows[i] for i in have]]
+                out[np.ix_(have, known)] = self.decode("지분율", stored[:, ids[known]])
+        return out
+
+
+_histories = {}
+_histories_lock = threading.Lock()
+
+
+def get_ownership_history(market):
+    """
+    프로세스 공용 시장별 지분율 이력
+    """
+    with _histories_lock:
+        if market not in _histories:
+            _histories[market] = OwnershipHistory(market)
+        return _histories[market]
+
+def ownership_columns(windows=OWNERSHIP_WINDOWS):
+    """
+    ownership_changes 반환 컬럼 이름
+    """
+    return ['지분변동'] + [f'지분변동_{n}d' for n in windows] + [TREND_COLUMN]
+
+def history_sessions(calendar, date_str, windows=OWNERSHIP_WINDOWS):
+    """
+    기간별 변동 계산에 필요한 기준일 이전 거래일 (오름차순, 기준일 제외)
+    """
+    return calendar.sessions_up_to(date_str, max(windows) + 1)[:-1]
+
+def plan_history(history, past_sessions, prev_date_str=None, windows=OWNERSHIP_WINDOWS, limit=SYNC_LIMIT):
+    """
+    분석 1회에 조회할 지분율 거래일 -> (이력에 이어서 적재할 거래일, 적재 없이 값만 쓸 기준 거래일)
+    밀린 거래일이 limit 이하면 이어서 적재하고, 그보다 많으면(빈 이력 등) 기간별 변동의 기준 거래일과
+    30일 전 비교일 중 이력에 없는 날만 조회합니다 (이 경우 지분추세는 비워 둠).
+    """
+    before, after = history.pending(past_sessions)
+    sync_days = after if len(after) <= limit else []
+    stored = set(history.dates) | set(sync_days)
+    points = [past_sessions[-n] for n in windows if n <= len(past_sessions)]
+    if prev_date_str is not None:
+        points.append(prev_date_str)
+    return sync_days, sorted(d for d in set(points) if d not in stored)
+
+def ownership_changes(history, current, past_sessions, prev_date_str=None, points=None,
+                      windows=OWNERSHIP_WINDOWS, slope_days=SLOPE_DAYS):
+    """
+    current: 기준일 지분율 Series, past_sessions: 기준일 이전 거래일 (history_sessions)
+    points: 이력에 없는 거래일의 지분율 {YYYYMMDD: Series} (plan_history 의 기준 거래일 조회분)
+    반환 컬럼 (종목 인덱스, 비교 값이 없으면 0):
+    - 지분변동: prev_date_str 대비 변동 (%p)
+    - 지분변동_{N}d: N 거래일 전 대비 변동 (%p)
+    - 지분추세: 최근 slope_days 거래일 지분율의 선형 회귀 기울기 (%p/거래일)
+      slope_days 거래일이 모두 있을 때만 계산하고, 아니면 NaN (일부 기준 거래일만으로 만든 기울기는 쓰지 않음)
+    """
+    tickers = current.index
+    cur = current.to_numpy(dtype=np.float64)
+    # 마지막 행이 기준일인 (거래일 x 종목) 배열
+    series = np.vstack([history.matrix(past_sessions, tickers), cur])
+    for d, values in (points or {}).items():
+        if d in past_sessions:
+            row = series[past_sessions.index(d)]
+            np.copyto(row, values.reindex(tickers).to_numpy(dtype=np.float64), where=np.isnan(row))
+
+    columns = {}
+    if prev_date_str is not None and prev_date_str in past_sessions:
+        columns['지분변동'] = cur - series[past_sessions.index(prev_date_str)]
+    else:
+        columns['지분변동'] = np.full(len(tickers), np.nan)
+    for n in windows:
+        past = series[-1 - n] if n < len(series) else np.full(len(tickers), np.nan)
+        columns[f'지분변동_{n}d'] = cur - past
+    recent = series[-slope_days:]
+    if len(recent) == slope_days and (~np.isnan(recent)).any(axis=1).all():
+        columns[TREND_COLUMN] = _slope(recent)
+    else:
+        columns[TREND_COLUMN] = np.full(len(tickers), np.nan)
+
+    df = pd.DataFrame(columns, index=tickers)
+    changes = df.columns.drop(TREND_COLUMN)
+    df[changes] = df[changes].fillna(0)
+    return df
+
+def _slope(y):
+    """
+    열(종목)별 선형 회귀 기울기 (NaN 제외, 유효 값 2개 미만이면 NaN)
+    """
+    x = np.arange(len(y), dtype=np.float64)[:, None]
+    valid = ~np.isnan(y)
+    n = valid.sum(axis=0)
+    xv = np.where(valid, x, 0.0)
+    yv = np.where(valid, y, 0.0)
+    sx, sy = xv.sum(axis=0), yv.sum(axis=0)
+    sxx, sxy = (xv * xv).sum(axis=0), (xv * yv).sum(axis=0)
+    denom = n * sxx - sx * sx
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where((n >= 2) & (denom > 0), (n * sxy - sx * sy) / denom, np.nan)
+
+def backfill_ownership(market, end_date, start_date=None, executor=None, windows=OWNERSHIP_WINDOWS):
+    """
+    start_date~end_date 기준일 분석에 필요한 지분율 이력을 모두 적재 (거래일마다 조회 1건)
+    화면 분석은 일부 거래일만 조회하므로 precompute / batch / 명령줄에서 미리 채워 둡니다.
+    적재에 실패하면 대체 처리로 기록하고 None 반환 (분석은 일부 기준 거래일만으로 계속 진행)
+    """
+    try:
+        calendar = get_calendar(end_date)
+        first = calendar.sessions_up_to(start_date or end_date, max(windows) + 1)[0]
+        history = get_ownership_history(market)
+        history.sync(calendar.sessions_between(first, end_date), executor)
+        return history
+    except Exception as e:
+        record_fallback("ownership_history", f"{market} 지분율 이력 적재 실패: {e}")
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="외국인 지분율 이력 적재")
+    parser.add_argument("--market", nargs="+", default=["KOSPI", "KOSDAQ"], choices=["KOSPI", "KOSDAQ"])
+    parser.add_argument("--start", help="분석 시작 기준일 (YYYYMMDD, 기본값: --end)")
+    parser.add_argument("--end", help="분석 기준일 (YYYYMMDD, 기본값: 어제)")
+    args = parser.parse_args()
+
+    end = args.end or (datetime.now() - timedelta(days=1)).strftime("%Y%m%d")
+    executor = FetchExecutor()
+    failed = False
+    for market in args.market:
+        history = backfill_ownership(market, end, args.start, executor)
+        if history is None:
+            failed = True
+            continue
+        print(f"{market}: {len(history.dates)}거래일 x {len(history.tickers)}종목 ({history.dates[:1]} ~ {history.dates[-1:]})")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+실행 단위 일별 패널
+
+분석 1회에 필요한 (데이터셋, 날짜, 시장, 투자자) 스냅샷을 키별로 한 번만 조회해 보관하고,
+당일 값, N일 합계/평균, 연속 순매수 입력 등 파생 데이터는 모두 이 일별 데이터에서 만듭니다.
+기간 합계를 별도 기간 조회로 받지 않으므로, 지나간 거래일의 스냅샷은 다음 거래일 분석에서도 그대로 재사용됩니다.
+"""
+import pandas as pd
+
+from instrumentation import record_fallback
+from krx_fetch import FetchExecutor
+
+INVESTORS = ['외국인', '금융투자', '투신', '연기금']
+
+
+def get_frame(frames, key):
+    """
+    조회 결과 꺼내기 (조회 실패 시 저장된 예외를 다시 발생)
+    """
+    result = frames[key]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+def market_data_keys(date_str, market):
+    keys = [("cap", date_str, market, None), ("ohlcv", date_str, market, None)]
+    keys += [("net_purchase", date_str, market, inv) for inv in INVESTORS]
+    keys.append(("program", date_str, market, None))
+    return keys
+
+def get_market_data(date_str, market, frames):
+    """
+    해당 날짜의 시세, 시가총액, 투자자별 순매수, 프로그램 매매 데이터를 모두 가져옵니다.
+    """
+    # 1. 기본 시세 및 시가총액 (등락률, 시총 확인용)
+    try:
+        df_cap = get_frame(frames, ("cap", date_str, market, None))
+        df_ohlcv = get_frame(frames, ("ohlcv", date_str, market, None))
+        # 등락률 컬럼 병합
+        df_master = df_cap.join(df_ohlcv['등락률'])
+    except Exception as e:
+        return None, f"시세 데이터 조회 실패: {e}"
+
+    # 2. 투자자별 순매수 (외국인, 금융투자, 투신, 연기금)
+    for inv in INVESTORS:
+        col_name = f'{inv}_순매수'
+        try:
+            df = get_frame(frames, ("net_purchase", date_str, market, inv))
+            # 컬럼명 변경: 순매수거래대금 -> 외국인_순매수, 등
+            df = df[['순매수거래대금']].rename(columns={'순매수거래대금': col_name})
+            df_master = df_master.join(df, how='left')
+        except Exception as e:
+            record_fallback(f"net_purchase:{inv}", e) # 데이터 없으면 0 처리
+        
+        # 데이터 수집 실패 시 해당 컬럼을 0으로 채움 (KeyError 방지)
+        if col_name not in df_master.columns:
+            df_master[col_name] = 0
+
+    # 3. 프로그램 매매 (순매수)
+    try:
+        # pykrx의 프로그램 매매 조회 기능 활용 (종목별)
+        df_prog = get_frame(frames, ("program", date_str, market, None))
+        df_prog = df_prog[['순매수거래대금']].rename(columns={'순매수거래대금': '프로그램_순매수'})
+        df_master = df_master.join(df_prog, how='left')
+    except Exception as e:
+        # 프로그램 매매 데이터 조회 실패 시 0으로 처리 (Priority 1 조건 체크 불가)
+        record_fallback("program", e)
+        df_master['프로그램_순매수'] = 0
+
+    return df_master.fillna(0), None
+
+
+class DailyPanel:
+    """
+    market 시장의 일별 스냅샷 모음. frames: {(데이터셋, 날짜, 시장, 투자자): DataFrame 또는 예외}
+    """
+    def __init__(self, market, executor=None):
+        self.market = market
+        self.executor = executor or FetchExecutor()
+        self.frames = {}
+
+    def load(self, keys, extra_tasks=None):
+        """
+        아직 없는 키만 모아 동시 조회합니다 (중복 키는 한 번만).
+        extra_tasks: 같은 묶음에서 함께 실행할 {이름: 인자 없는 함수} -> {이름: 결과 또는 예외} 반환
+        """
+        extra_tasks = extra_tasks or {}
+        tasks = {key: self.executor.snapshot_task(key) for key in dict.fromkeys(keys) if key not in self.frames}
+        tasks.update(extra_tasks)
+        results = self.executor.run(tasks)
+        extras = {name: results.pop(name) for name in extra_tasks}
+        self.frames.update(results)
+        return extras
+
+    def frame(self, dataset, date_str, investor=None):
+        return get_frame(self.frames, (dataset, date_str, self.market, investor))
+
+    def column(self, dataset, date_str, column, investor=None):
+        return self.frame(dataset, date_str, investor)[column]
+
+    def daily_sum(self, dataset, days, column, investor=None):
+        """
+        거래일별 column 값의 종목별 합계 (어느 날 없는 종목은 0으로 간주)
+        조회 실패한 날은 제외하고 대체 처리로 기록합니다.
+        """
+        total = pd.Series(dtype='float64')
+        for d in days:
+            try:
+                total = total.add(self.column(dataset, d, column, investor), fill_value=0)
+            except Exception as e:
+                name = dataset if investor is None else f"{dataset}:{investor}"
+                record_fallback(f"{name}:{d}", e)
+        return total
@@ -0,0 +1,447 @@
+"""
+다년 일별 패널 저장소 (memory-mapped 배열)
+
+시장별로 종목마다 고정 정수 ID(처음 등장한 순서)를 부여하고, 필드별로 (거래일 x 종목) 밀집 배열을
+int64/float32 memmap 파일에 저장합니다. 행은 거래일 오름차순이므로 "최근 N 거래일 전 종목" 조회는
+복사 없는 배열 view 입니다. 지나간(확정된) 거래일만 저장합니다.
+
+저장 위치: {STORE_DIR}/panel/{시장}/meta.json, {필드}.dat, .lock
+
+여러 프로세스(앱, precompute, batch, 적재 CLI)가 같은 저장소를 쓰므로 적재는 .lock 파일의 배타 잠금 안에서,
+조회는 공유 잠금 안에서 실행하고, 잠금을 잡을 때마다 다른 프로세스가 바꾼 meta.json 을 다시 읽습니다.
+
+사용 예:
+    python panel_store.py --market KOSPI --start 20180101 --end 20241231   # 구간 적재
+"""
+import argparse
+import bisect
+import json
+import os
+import threading
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timedelta
+
+try:
+    import fcntl
+except ImportError:  # Windows: 프로세스 간 잠금 없이 동작 (한 프로세스만 쓴다고 가정)
+    fcntl = None
+
+import numpy as np
+import pandas as pd
+
+from krx_fetch import FetchExecutor
+from krx_store import STORE_DIR, atomic_write, is_final
+from panel import INVESTORS, get_frame, get_market_data, market_data_keys
+from trading_calendar import get_calendar
+
+PANEL_DIR = os.path.join(STORE_DIR, "panel")
+INT_NA = np.iinfo(np.int64).min  # int64 필드의 결측값
+SYNC_SESSIONS = 20  # 한 번에 동시 조회할 거래일 수
+
+# 필드: (dtype, float32 필드를 읽을 때 복원할 소수 자릿수)
+FIELDS = {
+    "시가총액": (np.int64, None),
+    "종가": (np.int64, None),
+    "등락률": (np.float32, 2),
+    **{f"{inv}_순매수": (np.int64, None) for inv in INVESTORS},
+    "프로그램_순매수": (np.int64, None),
+    "지분율": (np.float32, 2),
+}
+
+
+def _na(dtype):
+    return np.nan if np.issubdtype(dtype, np.floating) else INT_NA
+
+
+class PanelStore:
+    """
+    market 시장의 (거래일 x 종목) 필드 배열
+    tickers: 종목 ID 순서의 티커 목록, dates: 저장된 거래일 (오름차순, 중간에 빠진 날 없음)
+    하위 클래스는 fields / listed_field / day_keys / day_fields 를 바꿔 다른 필드 묶음을 저장할 수 있습니다.
+    """
+    fields = FIELDS
+    listed_field = "시가총액"  # 값이 있으면 그날 상장 종목으로 간주
+
+    def __init__(self, market, root=None):
+        self.market = market
+        self.root = root or os.path.join(PANEL_DIR, market)
+        self.tickers = []
+        self.dates = []
+        self.row_capacity = 0
+        self.ticker_capacity = 0
+        self._ids = {}
+        self._arrays = {}
+        self._meta_stamp = None
+        self._lock = threading.RLock()
+        self._lock_depth = 0
+        self._load()
+
+    # --- 저장/복원 ---
+
+    def _meta_path(self):
+        return os.path.join(self.root, "meta.json")
+
+    def _field_path(self, field):
+        return os.path.join(self.root, f"{field}.dat")
+
+    def _lock_path(self):
+        return os.path.join(self.root, ".lock")
+
+    def _stat_meta(self):
+        try:
+            st = os.stat(self._meta_path())
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def _load(self):
+        self._meta_stamp = self._stat_meta()
+        if self._meta_stamp is None:
+            return
+        with open(self._meta_path(), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.tickers = meta["tickers"]
+        self.dates = meta["dates"]
+        self.row_capacity = meta["row_capacity"]
+        self.ticker_capacity = meta["ticker_capacity"]
+        self._ids = {t: i for i, t in enumerate(self.tickers)}
+
+    def _save_meta(self):
+        meta = {
+            "tickers": self.tickers, "dates": self.dates,
+            "row_capacity": self.row_capacity, "ticker_capacity": self.ticker_capacity,
+        }
+        with atomic_write(self._meta_path()) as tmp_path:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+        self._meta_stamp = self._stat_meta()
+
+    def _reload(self):
+        """
+        다른 프로세스가 meta.json 을 바꿨으면 다시 읽고 열어 둔 배열을 버림 (배열 파일이 교체됐을 수 있음)
+        """
+        if self._stat_meta() == self._meta_stamp:
+            return
+        self._arrays = {}
+        self._load()
+
+    @contextmanager
+    def _locked(self, exclusive=False):
+        """
+        스레드 잠금 + 프로세스 간 파일 잠금 (exclusive: 적재용 배타 잠금, 아니면 조회용 공유 잠금)
+        가장 바깥 호출에서만 파일 잠금을 잡고 meta 를 다시 읽으며, 안쪽 호출은 바깥 잠금을 그대로 사용합니다.
+        """
+        with self._lock:
+            if self._lock_depth:
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                return
+            lock_file = None
+            if fcntl is not None:
+                os.makedirs(self.root, exist_ok=True)
+                lock_file = open(self._lock_path(), "a")
+                fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            self._lock_depth = 1
+            try:
+                self._reload()
+                yield
+            finally:
+                self._lock_depth = 0
+                if lock_file is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                    lock_file.close()
+
+    def _array(self, field):
+        if field not in self._arrays:
+            dtype = self.fields[field][0]
+            self._arrays[field] = np.memmap(
+                self._field_path(field), dtype=dtype, mode="r+", shape=(self.row_capacity, self.ticker_capacity)
+            )
+        return self._arrays[field]
+
+    def _resize(self, rows, tickers, row_shift=0):
+        """
+        배열 용량을 (rows, tickers) 이상으로 늘립니다 (2배씩). row_shift 만큼 기존 행을 뒤로 밀어 앞쪽에 빈 행을 만듭니다.
+        """
+        if rows <= self.row_capacity and tickers <= self.ticker_capacity and row_shift == 0:
+            return
+        row_capacity, ticker_capacity = max(self.row_capacity, 1), max(self.ticker_capacity, 1)
+        while row_capacity < rows:
+            row_capacity *= 2
+        while ticker_capacity < tickers:
+            ticker_capacity *= 2
+        os.makedirs(self.root, exist_ok=True)
+        # 새로 등록된 종목은 기존 배열에 열이 없으므로 기존 용량까지만 복사
+        n_rows, n_tickers = len(self.dates), min(len(self.tickers), self.ticker_capacity)
+        # 모든 필드의 새 파일을 만든 뒤 한꺼번에 교체 (중간에 실패하면 기존 파일을 그대로 둠)
+        with ExitStack() as stack:
+            for field, (dtype, _) in self.fields.items():
+                tmp_path = stack.enter_context(atomic_write(self._field_path(field)))
+                new = np.memmap(tmp_path, dtype=dtype, mode="w+", shape=(row_capacity, ticker_capacity))
+                new[:] = _na(dtype)
+                if n_rows:
+                    new[row_shift:row_shift + n_rows, :n_tickers] = self._array(field)[:n_rows, :n_tickers]
+                new.flush()
+                del new
+        self._arrays = {}
+        self.row_capacity, self.ticker_capacity = row_capacity, ticker_capacity
+
+    # --- 쓰기 ---
+
+    def ticker_ids(self, tickers, add=False):
+        """
+        티커 -> 종목 ID 배열 (없는 종목은 add=True 면 새 ID 부여, 아니면 -1)
+        """
+        ids = np.empty(len(tickers), dtype=np.int64)
+        for i, t in enumerate(tickers):
+            if t not in self._ids and add:
+                self._ids[t] = len(self.tickers)
+                self.tickers.append(t)
+            ids[i] = self._ids.get(t, -1)
+        return ids
+
+    def _row_values(self, frame):
+        """
+        한 거래일 표 -> (티커, {필드: 저장 dtype 값 배열}) (배열을 건드리기 전에 변환해 실패를 미리 드러냄)
+        """
+        values = {}
+        for field, (dtype, _) in self.fields.items():
+            if field in frame.columns:
+                column = frame[field].to_numpy(dtype=np.float64)
+                if dtype is np.int64:
+                    column = np.where(np.isnan(column), INT_NA, column)
+                values[field] = column.astype(dtype)
+        return frame.index, values
+
+    def _write_row(self, row, ids, values):
+        for field, (dtype, _) in self.fields.items():
+            arr = self._array(field)
+            arr[row, :] = _na(dtype)
+            if field in values:
+                arr[row, ids] = values[field]
+
+    @contextmanager
+    def _rollback(self):
+        """
+        쓰기 도중 실패하면 메모리의 종목/거래일 목록을 시작 전으로 되돌림 (배열보다 종목 목록이 길어지지 않도록)
+        """
+        n_tickers, dates = len(self.tickers), list(self.dates)
+        capacity = (self.row_capacity, self.ticker_capacity)
+        try:
+            yield
+        except BaseException:
+            del self.tickers[n_tickers:]
+            self._ids = {t: i for i, t in enumerate(self.tickers)}
+            self.dates = dates
+            self._arrays = {}
+            if (self.row_capacity, self.ticker_capacity) != capacity:
+                # 배열 파일은 이미 늘어났으므로 meta 의 용량도 맞춤
+                self._save_meta()
+            raise
+
+    def _flush(self):
+        for arr in self._arrays.values():
+            arr.flush()
+        self._save_meta()
+
+    def append(self, days):
+        """
+        마지막 저장일 이후의 거래일 데이터를 추가. days: [(YYYYMMDD, 필드 컬럼 DataFrame)] 오름차순
+        """
+        with self._locked(exclusive=True):
+            if self.dates and days and days[0][0] <= self.dates[-1]:
+                raise ValueError(f"마지막 저장일({self.dates[-1]}) 이후 날짜만 추가할 수 있습니다: {days[0][0]}")
+            rows = [(date_str, *self._row_values(frame)) for date_str, frame in days]
+            with self._rollback():
+                for date_str, tickers, values in rows:
+                    ids = self.ticker_ids(tickers, add=True)
+                    self._resize(len(self.dates) + 1, len(self.tickers))
+                    self._write_row(len(self.dates), ids, values)
+                    self.dates.append(date_str)
+                self._flush()
+
+    def prepend(self, days):
+        """
+        첫 저장일 이전의 거래일 데이터를 앞에 추가 (기존 배열을 다시 씀). days: 오름차순
+        """
+        with self._locked(exclusive=True):
+            if not self.dates:
+                return self.append(days)
+            if days and days[-1][0] >= self.dates[0]:
+                raise ValueError(f"첫 저장일({self.dates[0]}) 이전 날짜만 앞에 추가할 수 있습니다: {days[-1][0]}")
+            rows = [(date_str, *self._row_values(frame)) for date_str, frame in days]
+            with self._rollback():
+                ids = [self.ticker_ids(tickers, add=True) for _, tickers, _ in rows]
+                self._resize(len(self.dates) + len(rows), len(self.tickers), row_shift=len(rows))
+                for row, ((_, _, values), row_ids) in enumerate(zip(rows, ids)):
+                    self._write_row(row, row_ids, values)
+                self.dates = [date_str for date_str, _, _ in rows] + self.dates
+                self._flush()
+
+    # --- 조회 ---
+
+    def row(self, date_str):
+        idx = bisect.bisect_left(self.dates, date_str)
+        if idx < len(self.dates) and self.dates[idx] == date_str:
+            return idx
+        return None
+
+    def window(self, field, end_date, n):
+        """
+        end_date 까지 최근 N개 저장 거래일의 (거래일 x 종목 ID) 원시 배열 view (복사 없음, 결측은 NaN/INT_NA)
+        반환: (view, 거래일 목록)
+        """
+        with self._locked():
+            row = self.row(end_date)
+            if row is None:
+                raise KeyError(f"{self.market} 패널에 없는 거래일: {end_date}")
+            start = max(0, row - n + 1)
+            return self._array(field)[start:row + 1, :len(self.tickers)], self.dates[start:row + 1]
+
+    def array(self, field):
+        """
+        저장된 전체 (거래일 x 종목 ID) 원시 배열 view (복사 없음)
+        """
+        with self._locked():
+            return self._array(field)[:len(self.dates), :len(self.tickers)]
+
+    def values(self, field, date_str):
+        """
+        한 거래일의 필드 값 (종목 ID 순, float64, 결측은 NaN, float32 필드는 소수 자릿수 복원)
+        """
+        view, _ = self.window(field, date_str, 1)
+        return self.decode(field, view[0])
+
+    def decode(self, field, values):
+        dtype, decimals = self.fields[field]
+        out = np.asarray(values, dtype=np.float64)
+        if dtype is np.int64:
+            out = np.where(values == INT_NA, np.nan, out)
+        elif decimals is not None:
+            out = np.round(out, decimals)
+        return out
+
+    def day_frame(self, date_str, fields=None):
+        """
+        한 거래일의 상장 종목(listed_field 값 있음) 표 (티커 인덱스, 필드 컬럼)
+        """
+        with self._locked():
+            listed = ~np.isnan(self.values(self.listed_field, date_str))
+            index = pd.Index(np.asarray(self.tickers, dtype=object)[listed], name="티커")
+            data = {field: self.values(field, date_str)[listed] for field in (fields or self.fields)}
+        return pd.DataFrame(data, index=index)
+
+    # --- 적재 ---
+
+    def day_keys(self, date_str):
+        """
+        한 거래일 적재에 필요한 스냅샷 키
+        """
+        keys = market_data_keys(date_str, self.market)
+        keys.append(("foreign", date_str, self.market, None))
+        return keys
+
+    def day_fields(self, date_str, frames):
+        """
+        스냅샷으로 한 거래일 필드 표 조립 (get_market_data + 종가 + 지분율) -> (DataFrame, 오류)
+        """
+        df, error = get_market_data(date_str, self.market, frames)
+        if error:
+            return None, error
+        df = df.drop(columns=["종가"], errors="ignore")
+        df = df.join(get_frame(frames, ("ohlcv", date_str, self.market, None))["종가"], how="left")
+        try:
+            df = df.join(get_frame(frames, ("foreign", date_str, self.market, None))["지분율"], how="left")
+        except Exception as e:
+            print(f"{self.market} {date_str} 지분율 조회 실패: {e}")
+        return df[[f for f in self.fields if f in df.columns]], None
+
+    def pending(self, sessions):
+        """
+        sessions(오름차순) 를 적재하려면 새로 받아야 하는 거래일 (앞쪽 확장분, 뒤쪽 추가분)
+        빠진 날이 없도록 기존 저장 구간과 이어지는 거래일까지 포함하며, 확정되지 않은 날은 제외합니다.
+        """
+        sessions = [d for d in sessions if is_final(d)]
+        if not sessions:
+            return [], []
+        if not self.dates:
+            return [], sessions
+        before = [d for d in sessions if d < self.dates[0]]
+        after = [d for d in sessions if d > self.dates[-1]]
+        calendar = get_calendar()
+        if before:
+            before = calendar.sessions_between(before[0], self.dates[0])[:-1]
+        if after:
+            after = calendar.sessions_between(self.dates[-1], after[-1])[1:]
+        return before, after
+
+    def sync(self, sessions, executor=None, frames=None):
+        """
+        sessions(오름차순) 중 확정됐지만 아직 없는 거래일을 스냅샷 저장소 경유로 조회해 적재합니다.
+        frames 가 주어지면 그 안에 이미 있는 스냅샷은 다시 조회하지 않습니다.
+        조회에 실패한 날이 있으면 빠진 날이 생기지 않도록 그 이후는 적재하지 않습니다.
+        동시에 여러 분석/프로세스가 같은 저장소를 맞추는 경우를 위해 적재 전체를 배타 잠금 안에서 실행하고,
+        잠금을 잡은 뒤 다시 읽은 meta 기준으로 받을 거래일을 정합니다 (먼저 적재한 쪽의 결과를 그대로 사용).
+        """
+        executor = executor or FetchExecutor()
+        with self._locked(exclusive=True):
+            before, after = self.pending(sessions)
+            if before:
+                days = self._collect(before, executor, frames)
+                if len(days) == len(before):
+                    self.prepend(days)
+            if after:
+                self.append(self._collect(after, executor, frames))
+
+    def _collect(self, sessions, executor, frames=None):
+        frames = frames or {}
+        days = []
+        for chunk_start in range(0, len(sessions), SYNC_SESSIONS):
+            chunk = sessions[chunk_start:chunk_start + SYNC_SESSIONS]
+            keys = [key for d in chunk for key in self.day_keys(d)]
+            chunk_frames = executor.fetch_snapshots([key for key in dict.fromkeys(keys) if key not in frames])
+            chunk_frames.update({key: frames[key] for key in keys if key in frames})
+            for d in chunk:
+                frame, error = self.day_fields(d, chunk_frames)
+                if error:
+                    print(f"{self.market} 패널 적재 중단 ({d}): {error}")
+                    return days
+                days.append((d, frame))
+        return days
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_panel_store(market):
+    """
+    프로세스 공용 시장별 패널 저장소
+    """
+    with _stores_lock:
+        if market not in _stores:
+            _stores[market] = PanelStore(market)
+        return _stores[market]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="다년 일별 패널 적재")
+    parser.add_argument("--market", nargs="+", default=["KOSPI", "KOSDAQ"], choices=["KOSPI", "KOSDAQ"])
+    parser.add_argument("--start", required=True, help="시작일 (YYYYMMDD)")
+    parser.add_argument("--end", help="종료일 (YYYYMMDD, 기본값: 어제)")
+    args = parser.parse_args()
+
+    end = args.end or (datetime.now() - timedelta(days=1)).strftime("%Y%m%d")
+    sessions = get_calendar(end, start_date=args.start).sessions_between(args.start, end)
+    executor = FetchExecutor()
+    for market in args.market:
+        store = get_panel_store(market)
+        store.sync(sessions, executor)
+        print(f"{market}: {len(store.dates)}거래일 x {len(store.tickers)}종목 ({store.dates[:1]} ~ {store.dates[-1:]})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+장 마감 후 사전 계산 스케줄러
+
+KOSPI/KOSDAQ 분석을 미리 실행해 결과를 artifacts 저장소와 결과 이력(result_history)에 남깁니다.
+UI에서 같은 기준일을 선택하면 분석 없이 저장된 결과를 바로 보여줍니다.
+
+사용 예:
+    python precompute.py                        # 가장 최근 마감 거래일 1회 계산 (cron 등록용)
+    python precompute.py --date 20240105        # 지정 기준일 계산
+    python precompute.py --loop --at 18:30      # 상주 실행: 매일 18:30 에 당일 분석
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+
+from artifacts import artifact_path, save_artifact
+from ownership import backfill_ownership
+from result_history import record_results
+from screener import analyze_market_v2
+
+MARKETS = ["KOSPI", "KOSDAQ"]
+DEFAULT_RUN_AT = "18:00"  # 투자자별 매매 동향이 확정되는 시각 이후
+
+
+def _run_time(now, at):
+    hour, minute = (int(x) for x in at.split(":"))
+    return now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+
+def default_date(now=None, at=DEFAULT_RUN_AT):
+    """
+    계산 시각이 지났으면 오늘, 아니면 어제 (휴장일은 분석 시 직전 거래일로 조정됨)
+    """
+    now = now or datetime.now()
+    target = now if now >= _run_time(now, at) else now - timedelta(days=1)
+    return target.strftime("%Y%m%d")
+
+def _exists(market, date_str):
+    # 선택일 자체가 거래일인 경우만 확인 (휴장일은 분석 후 실제 기준일로 저장됨)
+    return os.path.exists(artifact_path(market, date_str))
+
+def precompute(date_str, markets=MARKETS, force=False):
+    """
+    시장별로 분석해 결과를 저장 (이미 있으면 건너뜀). 실패한 시장 수를 반환
+    """
+    failed = 0
+    for market in markets:
+        if not force and _exists(market, date_str):
+            print(f"[건너뜀] {date_str} {market}: 이미 계산됨")
+            continue
+        start = time.perf_counter()
+        # 화면 분석은 지분율 이력을 일부만 조회하므로 여기서 전체를 채워 둠
+        backfill_ownership(market, date_str)
+        data = analyze_market_v2(market, date_str)
+        if "error" in data:
+            failed += 1
+            print(f"[실패] {date_str} {market}: {data['error']}")
+            continue
+        path = save_artifact(market, data)
+        # 투자자별 매매 동향 확정 시각 이후 계산한 당일 결과는 확정 결과로 이력에 기록
+        now = datetime.now()
+        record_results(market, data, final=now >= _run_time(now, DEFAULT_RUN_AT))
+        print(f"[완료] {data['actual_date']} {market}: {len(data['results'])}종목, {time.perf_counter() - start:.1f}초 -> {path}")
+    return failed
+
+def run_loop(at, markets):
+    """
+    매일 at 시각에 당일(휴장일이면 직전 거래일) 분석 실행
+    """
+    while True:
+        now = datetime.now()
+        next_run = _run_time(now, at)
+        if next_run <= now:
+            next_run += timedelta(days=1)
+        print(f"다음 계산: {next_run:%Y-%m-%d %H:%M}")
+        time.sleep((next_run - now).total_seconds())
+        # 한 번의 실패로 상주 실행이 멈추지 않도록 오류는 출력만 하고 다음 날 다시 실행
+        try:
+            precompute(next_run.strftime("%Y%m%d"), markets)
+        except Exception as e:
+            print(f"[실패] {next_run:%Y%m%d} 사전 계산 중단: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="수급 분석기 V2 사전 계산")
+    parser.add_argument("--date", help="분석 기준일 (YYYYMMDD, 기본값: 가장 최근 마감일)")
+    parser.add_argument("--markets", nargs="+", default=MARKETS, choices=MARKETS)
+    parser.add_argument("--at", default=DEFAULT_RUN_AT, help="계산 시각 (HH:MM)")
+    parser.add_argument("--loop", action="store_true", help="매일 --at 시각에 반복 실행")
+    parser.add_argument("--force", action="store_true", help="이미 계산된 결과도 다시 계산")
+    args = parser.parse_args()
+
+    if args.loop:
+        run_loop(args.at, args.markets)
+        return
+
+    failed = precompute(args.date or default_date(at=args.at), args.markets, args.force)
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
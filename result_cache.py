@@ -0,0 +1,153 @@
+"""
+프로세스 공용 분석 결과 캐시
+
+(시장, 기준일, 분석 조건) 단위로 analyze_market_v2 결과를 메모리에 보관합니다.
+- 같은 키를 여러 세션이 동시에 요청하면 한 번만 계산하고 나머지는 그 결과를 기다립니다 (single-flight).
+  계산하던 세션이 중단되면(Streamlit 재실행 등) 기다리던 세션 중 하나가 이어서 계산합니다.
+- 최근에 쓰지 않은 결과부터 지웁니다 (LRU).
+- 결과 객체를 그대로 돌려주므로 적중 시 직렬화/복사 비용이 없습니다. 반환값은 수정하지 마세요.
+"""
+import os
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import Future
+
+from krx_store import is_final
+from result_history import record_results
+from screener import (
+    ALL_MARKETS, CONSECUTIVE_INVESTORS, MIN_STREAK_INVESTORS, STREAK_DAYS, analyze_all_markets, analyze_market_v2,
+)
+
+DEFAULT_MAX_ENTRIES = int(os.environ.get("KRX_RESULT_CACHE_SIZE", "32"))
+
+
+class _Abandoned(Exception):
+    """
+    계산하던 쪽이 Exception 이 아닌 이유(재실행/중단 요청 등)로 멈춤 - 기다리던 쪽은 다시 시도
+    """
+
+
+class ResultCache:
+    """
+    single-flight + LRU 캐시. should_store(결과)가 False 인 결과는 대기 중인 요청에만 전달하고 보관하지 않습니다.
+    """
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, should_store=None):
+        self.max_entries = max_entries
+        self.should_store = should_store or (lambda result: True)
+        self.stats = Counter()
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        while True:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.stats["hit"] += 1
+                    return self._entries[key]
+                flight = self._inflight.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._inflight[key] = Future()
+                    self.stats["miss"] += 1
+                else:
+                    self.stats["wait"] += 1
+
+            if leader:
+                break
+            try:
+                return flight.result()
+            except _Abandoned:
+                self.stats["retry"] += 1
+
+        try:
+            result = compute()
+        except Exception as e:
+            # 계산 오류는 기다리던 요청에도 그대로 전달
+            with self._lock:
+                del self._inflight[key]
+            flight.set_exception(e)
+            raise
+        except BaseException:
+            # 이 세션만의 중단 사유는 전달하지 않고, 기다리던 요청이 다시 계산하도록 비워 둠
+            with self._lock:
+                del self._inflight[key]
+            flight.set_exception(_Abandoned())
+            raise
+
+        with self._lock:
+            del self._inflight[key]
+            if self.should_store(result):
+                self._entries[key] = result
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        flight.set_result(result)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _is_final_result(data):
+    # 오류 결과와 장중(미확정) 데이터는 보관하지 않음
+    return "error" not in data and is_final(data["actual_date"])
+
+_results = ResultCache(should_store=_is_final_result)
+
+
+class _SessionProgress:
+    """
+    계산을 맡은 세션의 진행 표시 콜백을 감쌈
+    콜백이 던진 예외(Streamlit 재실행 요청 등)가 공유 계산을 멈추지 않도록 보관했다가,
+    계산 결과를 다른 세션과 공유한 뒤 그 세션에서만 다시 발생시킵니다.
+    """
+    def __init__(self, progress):
+        self.progress = progress
+        self.error = None
+
+    def __call__(self, fraction, message):
+        if self.progress is None or self.error is not None:
+            return
+        try:
+            self.progress(fraction, message)
+        except BaseException as e:
+            self.error = e
+
+
+def analyze_cached(market, date_str, progress=None, streak_days=STREAK_DAYS,
+                   streak_investors=CONSECUTIVE_INVESTORS, min_streak_investors=MIN_STREAK_INVESTORS):
+    """
+    analyze_market_v2 의 캐시 버전 (인자 동일, market 이 ALL 이면 analyze_all_markets). 캐시 적중이나 다른 세션 계산 대기 시 progress 는 호출되지 않습니다.
+    """
+    key = (market, date_str, streak_days, tuple(streak_investors), min_streak_investors)
+    progress = _SessionProgress(progress)
+
+    def compute():
+        if market == ALL_MARKETS:
+            data = analyze_all_markets(
+                date_str, progress=progress, streak_days=streak_days,
+                streak_investors=streak_investors, min_streak_investors=min_streak_investors,
+            )
+        else:
+            data = analyze_market_v2(
+                market, date_str, progress=progress, streak_days=streak_days,
+                streak_investors=streak_investors, min_streak_investors=min_streak_investors,
+            )
+        # 기본 분석 조건 결과는 결과 이력에도 기록
+        if key[2:] == (STREAK_DAYS, tuple(CONSECUTIVE_INVESTORS), MIN_STREAK_INVESTORS):
+            record_results(market, data)
+        return data
+
+    try:
+        return _results.get_or_compute(key, compute)
+    finally:
+        if progress.error is not None:
+            raise progress.error
+
+def cache_stats():
+    return dict(_results.stats)
+
+def clear_results():
+    _results.clear()
@@ -0,0 +1,360 @@
+"""
+일별 스크리닝 결과 이력 (SQLite)
+
+analyze_market_v2 결과를 (기준일, 시장, 종목) 단위 행으로 로컬 SQLite 파일에 쌓아 두고,
+과거 결과를 다시 분석하지 않고 조회합니다.
+- 최근 N거래일 중 M회 이상 특정 순위에 포착된 종목
+- 종목별 첫 포착일
+- 종목별 점수 이력
+- 조건별 결과 Parquet/CSV 내보내기 (청크 단위로 읽어 씀)
+
+기본 분석 조건(연속 순매수 기간/주체)의 확정된(지난 거래일) 결과만 기록하며,
+같은 (기준일, 시장)을 다시 기록하면 이전 행을 지우고 새 결과로 바꿉니다.
+
+사용 예:
+    python result_history.py import                     # 저장된 사전 계산 결과(artifacts)를 이력에 적재
+    python result_history.py export --format parquet --out history.parquet --market KOSPI
+"""
+import argparse
+import glob
+import io
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from artifacts import ARTIFACT_DIR, ARTIFACT_VERSION, DEFAULT_PARAMS
+from krx_store import STORE_DIR, is_final
+from ownership import OWNERSHIP_WINDOWS
+from screener import ALL_MARKETS
+
+HISTORY_PATH = os.environ.get("KRX_HISTORY_DB", os.path.join(STORE_DIR, "history.sqlite3"))
+EXPORT_CHUNK_ROWS = 50000  # 내보내기 시 한 번에 읽는 행 수
+
+# 결과 컬럼 (이름, SQLite 타입, 내보내기 Arrow 타입)
+COLUMNS = [
+    ("date", "TEXT", pa.string()),
+    ("market", "TEXT", pa.string()),
+    ("ticker", "TEXT", pa.string()),
+    ("name", "TEXT", pa.string()),
+    ("rank", "INTEGER", pa.int64()),
+    ("priority", "TEXT", pa.string()),
+    ("score", "INTEGER", pa.int64()),
+    ("fluctuation", "REAL", pa.float64()),
+    ("market_cap", "REAL", pa.float64()),
+    ("total_avg", "REAL", pa.float64()),
+    ("foreign_avg", "REAL", pa.float64()),
+    ("trust_avg", "REAL", pa.float64()),
+    ("pension_avg", "REAL", pa.float64()),
+    ("fin_invest_avg", "REAL", pa.float64()),
+    ("foreign_diff", "REAL", pa.float64()),
+    *[(f"foreign_diff_{n}d", "REAL", pa.float64()) for n in OWNERSHIP_WINDOWS],
+    ("foreign_trend", "REAL", pa.float64()),
+    ("is_strict", "INTEGER", pa.int64()),
+    ("reasons", "TEXT", pa.string()),
+]
+COLUMN_NAMES = [name for name, _, _ in COLUMNS]
+EXPORT_SCHEMA = pa.schema([(name, arrow_type) for name, _, arrow_type in COLUMNS])
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS runs (
+    date TEXT NOT NULL,
+    market TEXT NOT NULL,
+    recorded_at TEXT NOT NULL,
+    result_count INTEGER NOT NULL,
+    PRIMARY KEY (market, date)
+);
+CREATE TABLE IF NOT EXISTS results (
+    {", ".join(f"{name} {sql_type}" for name, sql_type, _ in COLUMNS)},
+    PRIMARY KEY (market, date, ticker)
+);
+CREATE INDEX IF NOT EXISTS results_ticker ON results (ticker, date);
+CREATE INDEX IF NOT EXISTS results_priority ON results (market, priority, date);
+"""
+
+
+def _result_rows(date_str, market, results):
+    rows = []
+    for rank, r in enumerate(results, start=1):
+        amounts = r["amounts"]
+        windows = r.get("foreign_diff_windows", {})
+        rows.append((
+            date_str, market, r["ticker"], r["name"], rank, r["priority"], r["score"],
+            r["fluctuation"], r["market_cap"], r["total_avg"],
+            amounts["외국인"], amounts["투신"], amounts["연기금"], amounts["금융투자"],
+            r["foreign_diff"], *[windows.get(f"{n}d") for n in OWNERSHIP_WINDOWS], r.get("foreign_trend"),
+            int(r["is_strict"]), r["reasons"],
+        ))
+    return rows
+
+
+class ResultHistory:
+    """
+    스크리닝 결과 이력 DB. 조회 메서드는 DataFrame 을 반환합니다.
+    """
+    def __init__(self, path=None):
+        self.path = path or HISTORY_PATH
+        self._lock = threading.Lock()
+        self._initialized = False
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+    def _connect(self):
+        # 여러 프로세스/UI 세션이 동시에 쓰고 읽을 수 있도록 WAL 모드 + 잠금 대기
+        conn = sqlite3.connect(self.path, timeout=30)
+        with self._lock:
+            if not self._initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+                self._initialized = True
+        return conn
+
+    def _query(self, sql, params=()):
+        conn = self._connect()
+        try:
+            return pd.read_sql_query(sql, conn, params=params)
+        finally:
+            conn.close()
+
+    # --- 기록 ---
+
+    def record(self, market, data, final=False):
+        """
+        분석 결과(analyze_market_v2 반환값)를 기록. 오류 결과나 확정되지 않은 기준일은 기록하지 않고 False 반환
+        final: 당일 결과라도 장 마감 후 확정 데이터로 계산했으면 True (precompute)
+        """
+        if "error" in data or not (final or is_final(data["actual_date"])):
+            return False
+        date_str = data["actual_date"]
+        rows = _result_rows(date_str, market, data["results"])
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM results WHERE market = ? AND date = ?", (market, date_str))
+                conn.executemany(
+                    f"INSERT INTO results ({', '.join(COLUMN_NAMES)}) VALUES ({', '.join('?' * len(COLUMN_NAMES))})",
+                    rows,
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO runs (date, market, recorded_at, result_count) VALUES (?, ?, ?, ?)",
+                    (date_str, market, datetime.now().isoformat(timespec="seconds"), len(rows)),
+                )
+        finally:
+            conn.close()
+        return True
+
+    # --- 조회 ---
+
+    def sessions(self, market=None):
+        """
+        기록된 (기준일, 시장, 결과 수) 목록 (최근 기준일부터)
+        """
+        where, params = ("WHERE market = ?", (market,)) if market else ("", ())
+        return self._query(
+            f"SELECT date, market, result_count, recorded_at FROM runs {where} ORDER BY date DESC, market", params
+        )
+
+    def frequent_tickers(self, market, priority="1순위", sessions=10, min_count=3):
+        """
+        최근 sessions 개 기록 거래일 중 priority 로 min_count 회 이상 포착된 종목 (포착 횟수 많은 순)
+        """
+        return self._query(
+            """
+            WITH recent AS (SELECT date FROM runs WHERE market = ? ORDER BY date DESC LIMIT ?)
+            SELECT ticker, MAX(name) AS name, COUNT(*) AS count,
+                   MIN(date) AS first_date, MAX(date) AS last_date, ROUND(AVG(score), 1) AS avg_score
+            FROM results
+            WHERE market = ? AND priority = ? AND date IN (SELECT date FROM recent)
+            GROUP BY ticker
+            HAVING COUNT(*) >= ?
+            ORDER BY count DESC, last_date DESC, avg_score DESC
+            """,
+            (market, sessions, market, priority, min_count),
+        )
+
+    def first_appearances(self, market, since=None, priority=None):
+        """
+        종목별 첫 포착일 (priority 지정 시 해당 순위 기준). since 이후 처음 포착된 종목만 (최근 순)
+        """
+        where, params = "market = ?", [market]
+        if priority:
+            where += " AND priority = ?"
+            params.append(priority)
+        having = ""
+        if since:
+            having = "HAVING MIN(date) >= ?"
+            params.append(since)
+        return self._query(
+            f"""
+            SELECT ticker, MAX(name) AS name, MIN(date) AS first_date, MAX(date) AS last_date, COUNT(*) AS count
+            FROM results
+            WHERE {where}
+            GROUP BY ticker
+            {having}
+            ORDER BY first_date DESC, ticker
+            """,
+            params,
+        )
+
+    def score_history(self, ticker_or_name, market=None):
+        """
+        종목(코드 또는 종목명)의 기준일별 순위/점수 이력 (오래된 순)
+        """
+        where, params = "(ticker = ? OR name = ?)", [ticker_or_name, ticker_or_name]
+        if market:
+            where += " AND market = ?"
+            params.append(market)
+        return self._query(
+            f"""
+            SELECT date, market, ticker, name, rank, priority, score, total_avg, foreign_diff, reasons
+            FROM results WHERE {where} ORDER BY date, market
+            """,
+            params,
+        )
+
+    # --- 내보내기 ---
+
+    def iter_results(self, market=None, start=None, end=None, chunk_rows=EXPORT_CHUNK_ROWS):
+        """
+        조건에 맞는 결과 행을 chunk_rows 행씩 DataFrame 으로 반환하는 제너레이터 (기준일, 시장, 순위 순)
+        """
+        conditions, params = [], []
+        if market:
+            conditions.append("market = ?")
+            params.append(market)
+        if start:
+            conditions.append("date >= ?")
+            params.append(start)
+        if end:
+            conditions.append("date <= ?")
+            params.append(end)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        conn = self._connect()
+        try:
+            yield from pd.read_sql_query(
+                f"SELECT {', '.join(COLUMN_NAMES)} FROM results {where} ORDER BY date, market, rank",
+                conn, params=params, chunksize=chunk_rows,
+            )
+        finally:
+            conn.close()
+
+    def export(self, out, fmt="parquet", **filters):
+        """
+        결과를 out(파일 경로 또는 바이너리 파일 객체)에 Parquet/CSV 로 청크 단위 저장하고 행 수를 반환
+        filters: iter_results 인자 (market, start, end, chunk_rows)
+        """
+        if fmt not in ("parquet", "csv"):
+            raise ValueError(f"지원하지 않는 형식: {fmt}")
+        own_file = isinstance(out, (str, os.PathLike))
+        f = open(out, "wb") if own_file else out
+        total = 0
+        try:
+            if fmt == "parquet":
+                with pq.ParquetWriter(f, EXPORT_SCHEMA) as writer:
+                    for chunk in self.iter_results(**filters):
+                        writer.write_table(pa.Table.from_pandas(chunk, schema=EXPORT_SCHEMA, preserve_index=False))
+                        total += len(chunk)
+                    if total == 0:
+                        writer.write_table(EXPORT_SCHEMA.empty_table())
+            else:
+                # 엑셀 호환을 위해 첫 청크에만 BOM + 헤더
+                first = True
+                for chunk in self.iter_results(**filters):
+                    f.write(chunk.to_csv(index=False, header=first).encode("utf-8-sig" if first else "utf-8"))
+                    first = False
+                    total += len(chunk)
+                if first:
+                    f.write(",".join(COLUMN_NAMES).encode("utf-8-sig") + b"\n")
+        finally:
+            if own_file:
+                f.close()
+        return total
+
+    def export_bytes(self, fmt="parquet", **filters):
+        """
+        export 결과를 bytes 로 반환 (UI 다운로드용) -> (bytes, 행 수)
+        """
+        buf = io.BytesIO()
+        total = self.export(buf, fmt, **filters)
+        return buf.getvalue(), total
+
+    # --- 적재 ---
+
+    def import_artifacts(self, artifact_dir=None):
+        """
+        사전 계산 결과 파일(현재 버전 artifacts)을 이력에 적재하고 기록한 건수를 반환
+        """
+        pattern = os.path.join(artifact_dir or ARTIFACT_DIR, f"v{ARTIFACT_VERSION}", "*", "*.json")
+        recorded = 0
+        for path in sorted(glob.glob(pattern)):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    payload = json.load(f)
+            except Exception as e:
+                print(f"사전 계산 결과 읽기 실패 ({path}): {e}")
+                continue
+            if payload.get("params") != DEFAULT_PARAMS:
+                continue
+            recorded += self.record(payload["market"], payload)
+        return recorded
+
+
+_history = None
+_history_lock = threading.Lock()
+
+
+def get_result_history():
+    """
+    프로세스 공용 결과 이력 DB
+    """
+    global _history
+    with _history_lock:
+        if _history is None:
+            _history = ResultHistory()
+        return _history
+
+def record_results(market, data, final=False):
+    """
+    분석 결과를 이력에 기록 (기록 실패는 출력만 하고 분석 흐름은 계속)
+    전체 시장(ALL) 결과는 시장별로 나누어 기록합니다. final 은 ResultHistory.record 참고
+    """
+    try:
+        if market == ALL_MARKETS:
+            if "error" in data:
+                return False
+            return all([
+                get_result_history().record(m, {**data, "results": [r for r in data["results"] if r["market"] == m]}, final)
+                for m in data["markets"]
+            ])
+        return get_result_history().record(market, data, final)
+    except Exception as e:
+        print(f"결과 이력 기록 실패 ({market} {data.get('actual_date')}): {e}")
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="스크리닝 결과 이력 관리")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("import", help="저장된 사전 계산 결과(artifacts)를 이력에 적재")
+    export = sub.add_parser("export", help="이력을 Parquet/CSV 파일로 내보내기")
+    export.add_argument("--format", default="parquet", choices=["parquet", "csv"])
+    export.add_argument("--out", required=True, help="저장 파일 경로")
+    export.add_argument("--market", choices=["KOSPI", "KOSDAQ"])
+    export.add_argument("--start", help="시작 기준일 (YYYYMMDD)")
+    export.add_argument("--end", help="종료 기준일 (YYYYMMDD)")
+    args = parser.parse_args()
+
+    history = get_result_history()
+    if args.command == "import":
+        print(f"{history.import_artifacts()}건 적재 -> {history.path}")
+    else:
+        total = history.export(args.out, args.format, market=args.market, start=args.start, end=args.end)
+        print(f"{total}행 -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+V2 스코어링 엔진
+
+Streamlit에 의존하지 않는 순수 함수로, 종목별 반복 대신 DataFrame/NumPy 벡터 연산으로
+우선순위(1/2/3순위) 판정, 필터링, 가산점, 정렬을 한 번에 수행합니다.
+판정 기준값은 ScoringParams 로 바꿀 수 있어, 이미 모은 데이터로 조회 없이 다시 채점할 수 있습니다.
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+PRIORITY_1_REASON = "프로그램 매도세 극복"
+PRIORITY_2_REASON = "외인/투신/연기금 동반 매수"
+BONUS_REASON = "수급비중 상위"
+
+
+class ScoringParams(namedtuple("ScoringParams", [
+    "max_fluctuation",        # 당일 등락률 상한 (%, 이상이면 제외)
+    "fin_invest_sell_ratio",  # 금융투자 순매도 한도 (시가총액 대비 비율, 초과 매도 시 제외)
+    "foreign_amount",         # 1순위 당일 / 3순위 평균 외국인 순매수 기준 (원)
+    "trust_amount",           # 1순위 당일 / 3순위 평균 투신 순매수 기준 (원)
+    "pension_amount",         # 1순위 당일 / 3순위 평균 연기금 순매수 기준 (원)
+    "bonus_top_n",            # 수급비중 상위 가산점 대상 종목 수
+    "bonus_score",            # 수급비중 상위 가산점
+    "min_avg_sum",            # 3주체 평균 순매수 합계 하한 (원)
+], defaults=[15.0, 0.001, 2000000000, 1000000000, 1000000000, 50, 10, 1000000000])):
+    """
+    채점 기준값 (기본값은 V2 모델 원래 기준)
+    """
+    __slots__ = ()
+
+DEFAULT_SCORING = ScoringParams()
+
+
+def score_market(df, strict_set, relaxed_set, set_for, set_trust, set_pension, params=DEFAULT_SCORING):
+    """
+    당일 데이터와 3일 평균 데이터가 병합된 df 를 params 기준으로 채점합니다.
+    반환: 조건을 통과한 종목만 담아 순위/점수/합계 순으로 정렬한 DataFrame
+          (score, priority, reasons, total_avg, is_strict 컬럼 추가)
+    """
+    tickers = df.index
+    market_cap = df['시가총액']
+    prog_buy = df['프로그램_순매수']
+    for_buy = df['외국인_순매수']
+    inv_trust_buy = df['투신_순매수']
+    pension_buy = df['연기금_순매수']
+
+    # 수급비중 상위 N개 종목 (가산점용, 기본값 50개)
+    supply_ratio = (for_buy + inv_trust_buy + pension_buy) / market_cap
+    top_ratio_tickers = supply_ratio.sort_values(ascending=False).head(params.bonus_top_n).index
+    is_top_ratio = tickers.isin(top_ratio_tickers)
+
+    in_strict = tickers.isin(strict_set)
+    in_relaxed = tickers.isin(relaxed_set)
+    in_for = tickers.isin(set_for)
+    in_trust = tickers.isin(set_trust)
+    in_pension = tickers.isin(set_pension)
+
+    # --- [Step 1: 필터링 (광탈 조건)] ---
+    # 1. 당일 주가상승률 15% 이상 과열 종목 제외
+    # 2. 금융투자 대량 매도 제외 (시총의 -0.1% 이상 매도)
+    passed = ~(df['등락률'] >= params.max_fluctuation).to_numpy()
+    passed &= ~(df['금융투자_순매수'] < -(market_cap * params.fin_invest_sell_ratio)).to_numpy()
+
+    # 3. 1순위 조건 만족 시 연속 순매수 무관하게 통과
+    # 1순위 조건: 프로그램 매도, 외인(20억↑)/투신(10억↑)/연기금(10억↑) 매수
+    is_priority_1 = (
+        (prog_buy < 0) &
+        (for_buy >= params.foreign_amount) &
+        (inv_trust_buy >= params.trust_amount) &
+        (pension_buy >= params.pension_amount)
+    ).to_numpy()
+    passed &= is_priority_1 | in_relaxed
+
+    # --- [Step 2: 점수 산정 (Scoring)] ---
+    # Priority 2 (정석 주도주형) - Strict History Required
+    is_priority_2 = ~is_priority_1 & in_strict & (
+        (for_buy > 0) & (inv_trust_buy > 0) & (pension_buy > 0)
+    ).to_numpy()
+
+    # Priority 3 (차선책) - 2곳 이상 당일 매수 + 연속 순매수 주체별 3일 평균 금액 조건
+    # 외국인: 20억 이상, 투신/연기금: 10억 이상
+    buy_count = (
+        (for_buy > 0).astype(int) + (inv_trust_buy > 0).astype(int) + (pension_buy > 0).astype(int)
+    ).to_numpy()
+    amount_ok = (
+        ~(in_for & (df['외국인_평균'] < params.foreign_amount).to_numpy()) &
+        ~(in_trust & (df['투신_평균'] < params.trust_amount).to_numpy()) &
+        ~(in_pension & (df['연기금_평균'] < params.pension_amount).to_numpy())
+    )
+    is_priority_3 = ~is_priority_1 & ~is_priority_2 & (buy_count >= 2) & amount_ok
+
+    # 점수가 없으면 탈락
+    passed &= is_priority_1 | is_priority_2 | is_priority_3
+
+    # 4. 평균 순매수 합계 10억 미만 제외 (금융투자 제외)
+    # 5. 각 주체별 3일 평균 순매수 중 하나라도 음수이면 제외
+    avg_sum = df['외국인_평균'] + df['투신_평균'] + df['연기금_평균']
+    passed &= ~(avg_sum < params.min_avg_sum).to_numpy()
+    passed &= ~((df['외국인_평균'] < 0) | (df['투신_평균'] < 0) | (df['연기금_평균'] < 0)).to_numpy()
+
+    score = np.select([is_priority_1, is_priority_2, is_priority_3], [100, 70, 40], default=0)
+    score = score + np.where(is_top_ratio, params.bonus_score, 0)
+    priority_rank = np.select([is_priority_1, is_priority_2, is_priority_3], [1, 2, 3], default=0)
+    priority = np.array(["None", "1순위", "2순위", "3순위"], dtype=object)[priority_rank]
+
+    scored = df[passed].copy()
+    scored['score'] = score[passed]
+    scored['priority'] = priority[passed]
+    scored['total_avg'] = avg_sum[passed]
+    scored['is_strict'] = in_strict[passed]
+
+    # 사유 문자열 조합
+    p3_reasons = "주요 주체 " + pd.Series(buy_count[passed], index=scored.index).astype(str) + "곳 매수"
+    reasons = pd.Series(
+        np.where(is_priority_1[passed], PRIORITY_1_REASON,
+                 np.where(is_priority_2[passed], PRIORITY_2_REASON, p3_reasons)),
+        index=scored.index,
+    )
+    scored['reasons'] = reasons.where(~is_top_ratio[passed], reasons + ", " + BONUS_REASON)
+
+    # 정렬: 1. 순위(오름차순), 2. 점수(내림차순), 3. 합계(내림차순) - 동순위는 원래 순서 유지
+    order = np.lexsort((-scored['total_avg'].to_numpy(), -scored['score'].to_numpy(), priority_rank[passed]))
+    return scored.iloc[order]
+
+
+def to_results(scored):
+    """
+    채점 결과 DataFrame 을 화면 표시용 dict 리스트로 변환 (name 컬럼 필요)
+    """
+    # 기간별 지분율 변동 컬럼 (지분변동_5d -> foreign_diff_5d)
+    window_cols = [c for c in scored.columns if c.startswith('지분변동_')]
+    results = []
+    for ticker, row in zip(scored.index, scored.to_dict('records')):
+        results.append({
+            'ticker': ticker,
+            'name': row['name'],
+            'score': int(row['score']),
+            'priority': row['priority'],
+            'fluctuation': float(row['평균등락률']),
+            'market_cap': float(row['시가총액']),
+            'reasons': row['reasons'],
+            'total_avg': float(row['total_avg']),
+            'amounts': {
+                '외국인': float(row['외국인_평균']),
+                '투신': float(row['투신_평균']),
+                '연기금': float(row['연기금_평균']),
+                '금융투자': float(row['금융투자_평균'])
+            },
+            'is_strict': bool(row['is_strict']),
+            'foreign_diff': float(row['지분변동']),
+            'foreign_diff_windows': {c.split('_', 1)[1]: float(row[c]) for c in window_cols},
+            # 지분추세는 이력이 부족하면 비어 있음 (None)
+            'foreign_trend': None if pd.isna(row.get('지분추세')) else float(row['지분추세']),
+        })
+    return results
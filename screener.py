@@ -0,0 +1,402 @@
+"""
+수급 분석기 V2 - 분석 코어 (Streamlit 비의존)
+
+조회는 (데이터셋, 날짜, 시장, 투자자) 키로 미리 모아 일별 패널(DailyPanel)로 키마다 한 번만 실행하고,
+이 모듈의 함수들은 그 결과(frames)로 표를 조립합니다. UI(app_v2.py)와 배치(batch.py)가 함께 사용합니다.
+"""
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import partial
+
+import pandas as pd
+
+from instrumentation import RunMetrics, activate, record_cache, record_fallback, stage, stage_prefix
+from krx_fetch import FetchExecutor
+from ownership import (
+    TREND_COLUMN, get_ownership_history, history_sessions, ownership_changes, ownership_columns, plan_history,
+)
+from panel import INVESTORS, DailyPanel, get_frame, get_market_data, market_data_keys
+from scoring import DEFAULT_SCORING, score_market, to_results
+from streaks import advance_streaks, consecutive_sets, plan_streaks
+from ticker_master import attach_names, load_ticker_master
+from trading_calendar import get_calendar
+
+MARKETS = ['KOSPI', 'KOSDAQ']
+ALL_MARKETS = 'ALL'  # 전체 시장 동시 분석 (analyze_all_markets)
+CONSECUTIVE_INVESTORS = ['외국인', '투신', '연기금']
+AVERAGE_DAYS = 3   # 평균 순매수/등락률 계산 기간
+STREAK_DAYS = 3    # 연속 순매수 판정 기간
+MIN_STREAK_INVESTORS = 2  # 3순위(relaxed) 판정에 필요한 연속 순매수 주체 수
+
+def consecutive_keys(market, days, investors=CONSECUTIVE_INVESTORS):
+    return [("net_purchase", d, market, inv) for d in days for inv in investors]
+
+def average_keys(market, valid_days):
+    # 기간 조회 대신 거래일별 스냅샷을 합산 (당일/연속 순매수용 키와 겹치는 조회는 한 번만 실행됨)
+    keys = [("net_purchase", d, market, inv) for d in valid_days for inv in INVESTORS]
+    keys += [("ohlcv", d, market, None) for d in valid_days]
+    return keys
+
+def get_recent_business_days(ref_date_str, duration=3):
+    """
+    기준일 포함 최근 N일의 영업일 리스트 반환 (로컬 거래일 달력 사용)
+    """
+    try:
+        return get_calendar(ref_date_str).sessions_up_to(ref_date_str, duration)
+    except Exception as e:
+        print(f"영업일 조회 실패: {e}")
+        return []
+
+def find_past_business_day(current_date_str, days_ago=30, calendar=None):
+    """
+    기준일로부터 N일 전 시점의 가장 최근 영업일 (10일 이내에 없으면 None)
+    calendar: 이미 기준일까지 확보한 달력 (없으면 확보 후 사용)
+    """
+    calendar = calendar or get_calendar(current_date_str)
+    return calendar.session_days_before(current_date_str, days_ago)
+
+def get_foreign_ownership_change(market, current_date_str, prev_date_str, frames, history, past_sessions,
+                                 point_days=()):
+    """
+    외국인 지분율 변동 계산 (당일 지분율 스냅샷 + 로컬 지분율 이력 + 이력에 없는 기준 거래일 스냅샷)
+    - 지분변동: 과거 영업일(30일 전) 대비, 지분변동_{N}d: N 거래일 전 대비, 지분추세: 최근 추세 기울기
+    """
+    try:
+        if prev_date_str is None:
+            record_fallback("foreign", "30일 전 비교 영업일 없음")
+
+        points = {}
+        for d in point_days:
+            try:
+                points[d] = get_frame(frames, ("foreign", d, market, None))['지분율']
+            except Exception as e:
+                record_fallback("foreign", e)
+
+        missing = [d for d in past_sessions if history.row(d) is None and d not in points]
+        if missing:
+            record_fallback(
+                "ownership_history",
+                f"지분율 이력 {len(missing)}거래일 없음 ({missing[0]}~{missing[-1]}, python ownership.py 로 적재)",
+            )
+
+        # 현재 지분율
+        df_curr = get_frame(frames, ("foreign", current_date_str, market, None))
+        return ownership_changes(history, df_curr['지분율'], past_sessions, prev_date_str, points)
+    except Exception as e:
+        print(f"지분율 분석 실패: {e}")
+        record_fallback("foreign", e)
+        return None
+
+def get_consecutive_tickers_sets(market, date_str, frames, plan, streak_days=STREAK_DAYS,
+                                 investors=CONSECUTIVE_INVESTORS, min_investors=MIN_STREAK_INVESTORS):
+    """
+    plan: plan_streaks 결과 (출발 상태, 새로 반영할 거래일)
+    반환값: (strict_set, relaxed_set, 투자자별 연속 순매수 집합)
+    """
+    try:
+        base, days = plan
+        daily_net_purchases = [
+            {inv: get_frame(frames, ("net_purchase", d, market, inv))['순매수거래대금'] for inv in investors}
+            for d in days
+        ]
+        counter = advance_streaks(market, date_str, base, daily_net_purchases, investors)
+        if counter.depth < streak_days:
+            record_fallback("streaks", f"누적 거래일 부족 ({counter.depth}/{streak_days})")
+            return set(), set(), {inv: set() for inv in investors}
+        return consecutive_sets(counter, streak_days, min_investors)
+    except Exception as e:
+        print(f"연속 순매수 조회 실패: {e}")
+        record_fallback("streaks", e)
+        return set(), set(), {inv: set() for inv in investors}
+
+def analyze_market_v2(market, date_str, progress=None, executor=None, streak_days=STREAK_DAYS,
+                      streak_investors=CONSECUTIVE_INVESTORS, min_streak_investors=MIN_STREAK_INVESTORS,
+                      scoring=DEFAULT_SCORING):
+    """
+    시장/기준일 단위 V2 스코어링 분석
+    progress: 진행 상황 콜백 progress(비율 0~1, 메시지) (선택)
+    streak_days / streak_investors / min_streak_investors: 연속 순매수 판정 기간, 대상 주체, relaxed 판정 주체 수
+    scoring: 채점 기준값 (ScoringParams)
+    반환: {"results": [...], "actual_date": ..., "fetch_stats": [...], "prepared": {...}, "metrics": {...}}
+          또는 {"error": ..., "metrics": {...}}
+    prepared 는 채점 직전 데이터로, rescore 로 기준값만 바꿔 다시 채점할 때 사용합니다.
+    metrics 는 단계별 소요 시간, 데이터 소스 호출, 캐시 적중, 0 대체 데이터 요약이며 JSON 로그(krx.metrics)로도 남깁니다.
+    """
+    report = progress or (lambda fraction, message: None)
+    metrics = RunMetrics(market=market, date=date_str)
+    with activate(metrics):
+        prepared = prepare_market_v2(market, date_str, report, executor, streak_days, streak_investors, min_streak_investors)
+        if "error" in prepared:
+            data = prepared
+        else:
+            data = {
+                "results": score_prepared(prepared, scoring),
+                "actual_date": prepared["actual_date"],
+                "fetch_stats": prepared["fetch_stats"],
+                "prepared": prepared,
+            }
+            report(1.0, "분석 완료")
+    metrics.finish(actual_date=data.get("actual_date"), error=data.get("error"))
+    metrics.log()
+    data["metrics"] = metrics.summary()
+    return data
+
+def analyze_all_markets(date_str, progress=None, executor=None, streak_days=STREAK_DAYS,
+                        streak_investors=CONSECUTIVE_INVESTORS, min_streak_investors=MIN_STREAK_INVESTORS,
+                        scoring=DEFAULT_SCORING, markets=MARKETS):
+    """
+    여러 시장(기본 KOSPI+KOSDAQ)을 한 번에 분석해 하나의 순위표로 병합 (결과마다 'market' 키 추가)
+    - 공통 단계(영업일 달력, 종목 마스터)는 한 번만 실행
+    - 시장별 조회/집계/채점은 병렬로 실행하고, 시장마다 자기 FetchExecutor 를 씀
+      (요청 수 제한은 실행 단위이므로 단일 시장 분석 2건을 동시에 돌린 것과 같은 예산)
+      executor 를 주면 모든 시장이 그 executor(요청 수 제한)를 함께 씀
+    - 일부 시장만 실패하면 나머지 시장 결과를 반환하고 실패는 대체 처리로 기록
+    인자/반환은 analyze_market_v2 와 같고, 반환에 "markets"(결과에 포함된 시장 목록)가 추가되며
+    "prepared" 는 {시장: 채점 직전 데이터} 입니다. 가산점(수급비중 상위)은 시장별로 판정합니다.
+    """
+    report = progress or (lambda fraction, message: None)
+    executors = {m: executor or FetchExecutor() for m in markets}
+    metrics = RunMetrics(market=ALL_MARKETS, date=date_str)
+    with activate(metrics):
+        # 1. 공통: 영업일 달력 확보 (시장별 분석은 확보된 달력만 읽음)
+        report(0.0, "영업일 확인 중...")
+        with stage("calendar"):
+            valid_days = get_recent_business_days(date_str, AVERAGE_DAYS)
+        if len(valid_days) < AVERAGE_DAYS:
+            data = {"error": f"최근 {AVERAGE_DAYS}일치 영업일을 확보하지 못했습니다."}
+        else:
+            data = _analyze_markets(
+                date_str, report, executors, streak_days, streak_investors, min_streak_investors, scoring, markets,
+            )
+    metrics.finish(actual_date=data.get("actual_date"), error=data.get("error"))
+    metrics.log()
+    data["metrics"] = metrics.summary()
+    return data
+
+def _analyze_markets(date_str, report, executors, streak_days, streak_investors, min_streak_investors,
+                     scoring, markets):
+    """
+    analyze_all_markets 의 시장별 분석과 병합 (달력 확보 이후, 실행 지표 수집 중에 호출)
+    """
+    # 2. 시장별 분석(조회~채점)과 종목 마스터 조회를 동시에 실행
+    # 진행 상황은 작업 스레드에서 모아 두고 호출한 스레드에서만 보고 (UI 요소는 호출 스레드에서만 갱신 가능)
+    states = {m: (0.0, "대기 중...") for m in markets}
+
+    def market_report(market, fraction, message):
+        states[market] = (fraction, message)
+
+    def run_market(market, master_future):
+        # 시장별 조회~집계 후 공통 종목 마스터를 받아 채점 (단계 소요 시간은 시장별로 따로 기록)
+        with stage_prefix(market):
+            prepared = prepare_market_v2(
+                market, date_str, partial(market_report, market), executors[market],
+                streak_days, streak_investors, min_streak_investors, load_master=False,
+            )
+            if "error" in prepared:
+                return prepared, None
+            prepared["ticker_master"] = master_future.result()["ticker_master"]
+            return prepared, score_prepared(prepared, scoring)
+
+    with ThreadPoolExecutor(max_workers=len(markets) + 1) as pool:
+        # 종목 마스터는 첫 시장의 executor 로 조회 (요청 1건)
+        master_executor = executors[markets[0]]
+        master_future = pool.submit(
+            contextvars.copy_context().run, master_executor.run,
+            {"ticker_master": partial(load_ticker_master, throttle=master_executor.limiter.acquire)},
+        )
+        futures = {
+            m: pool.submit(contextvars.copy_context().run, run_market, m, master_future) for m in markets
+        }
+        pending = set(futures.values())
+        while pending:
+            _, pending = wait(pending, timeout=0.2)
+            fraction = sum(f for f, _ in states.values()) / len(markets)
+            report(0.9 * fraction, " / ".join(f"{m}: {msg}" for m, (_, msg) in states.items()))
+        outcomes = {m: future.result() for m, future in futures.items()}
+        ticker_master = master_future.result()["ticker_master"]
+
+    errors = {m: p["error"] for m, (p, _) in outcomes.items() if "error" in p}
+    for m, error in errors.items():
+        record_fallback(f"market:{m}", error)
+    outcomes = {m: outcome for m, outcome in outcomes.items() if m not in errors}
+    if isinstance(ticker_master, Exception):
+        print(f"종목 마스터 조회 실패: {ticker_master}")
+
+    if not outcomes:
+        data = {"error": " / ".join(f"{m}: {error}" for m, error in errors.items())}
+    else:
+        # 3. 시장별 채점 결과 병합
+        prepared = {m: p for m, (p, _) in outcomes.items()}
+        # 시장별 executor 의 호출 기록을 합쳐 느린 순으로 (같은 executor 를 함께 쓴 경우 한 번만)
+        distinct = {id(e): e for e in executors.values()}.values()
+        fetch_stats = sorted((s for e in distinct for s in e.latency_report()), key=lambda s: -s["elapsed"])
+        data = {
+            "results": merge_market_results({m: results for m, (_, results) in outcomes.items()}),
+            "actual_date": max(p["actual_date"] for p in prepared.values()),
+            "fetch_stats": fetch_stats,
+            "prepared": prepared,
+            "markets": list(prepared),
+        }
+        report(1.0, "분석 완료")
+    return data
+
+def score_markets(prepared_by_market, scoring=DEFAULT_SCORING):
+    """
+    {시장: 채점 직전 데이터} 를 시장별로 채점해 병합한 결과 리스트
+    """
+    return merge_market_results({m: score_prepared(p, scoring) for m, p in prepared_by_market.items()})
+
+def merge_market_results(results_by_market):
+    """
+    시장별 결과 리스트를 하나로 병합 (market 키 추가)
+    정렬 기준은 시장별 결과와 같음: 순위(오름차순), 점수(내림차순), 합계(내림차순). 같은 시장 안의 순서는 유지됩니다.
+    """
+    merged = [{**r, 'market': m} for m, results in results_by_market.items() for r in results]
+    merged.sort(key=lambda r: (r['priority'], -r['score'], -r['total_avg']))
+    return merged
+
+def rescore(data, scoring=DEFAULT_SCORING):
+    """
+    analyze_market_v2 결과를 다른 채점 기준값으로 다시 채점 (데이터 조회 없음, 원래 결과는 그대로 둠)
+    """
+    if "error" in data:
+        return data
+    if "markets" in data:
+        return {**data, "results": score_markets(data["prepared"], scoring)}
+    return {**data, "results": score_prepared(data["prepared"], scoring)}
+
+def score_prepared(prepared, scoring=DEFAULT_SCORING):
+    """
+    채점 직전 데이터(prepared)를 채점해 결과 리스트를 반환
+    """
+    # 6. 채점 (필터링, 우선순위, 가산점, 정렬)
+    with stage("scoring"):
+        investor_sets = prepared["investor_sets"]
+        scored = score_market(
+            prepared["frame"], prepared["strict_set"], prepared["relaxed_set"],
+            investor_sets.get('외국인', set()), investor_sets.get('투신', set()), investor_sets.get('연기금', set()),
+            scoring,
+        )
+
+    # 종목명 병합 (종목 마스터 조회 실패 시 최종 통과 종목만 개별 조회)
+    with stage("names"):
+        # 개별 조회한 종목명은 prepared 에 남겨 다시 채점할 때 재사용
+        ticker_master = prepared["ticker_master"]
+        if isinstance(ticker_master, Exception):
+            record_fallback("ticker_master", ticker_master)
+            ticker_master = None
+        scored = attach_names(scored, ticker_master, prepared.setdefault("names", {}))
+        return to_results(scored)
+
+def prepare_market_v2(market, date_str, report, executor=None, streak_days=STREAK_DAYS,
+                      streak_investors=CONSECUTIVE_INVESTORS, min_streak_investors=MIN_STREAK_INVESTORS,
+                      load_master=True):
+    """
+    조회부터 채점 직전까지 (당일/평균/지분변동이 병합된 표와 연속 순매수 집합)
+    load_master=False 이면 종목 마스터를 조회하지 않음 (ticker_master 는 None, 호출한 쪽에서 채움)
+    반환: {"frame", "strict_set", "relaxed_set", "investor_sets", "ticker_master", "actual_date", "fetch_stats"}
+          또는 {"error": ...}
+    """
+    panel = DailyPanel(market, executor)
+
+    # 1. 영업일 확보
+    report(0.0, "영업일 확인 중...")
+    with stage("calendar"):
+        valid_days = get_recent_business_days(date_str, AVERAGE_DAYS)
+        if len(valid_days) < AVERAGE_DAYS:
+            return {"error": f"최근 {AVERAGE_DAYS}일치 영업일을 확보하지 못했습니다."}
+
+        # 실제 분석 기준일 (휴장일 선택 시 가장 최근 영업일로 자동 조정됨)
+        actual_date_str = valid_days[-1]
+
+        # 이후 단계는 위에서 확보한 달력만 읽음 (추가 조회 없음)
+        calendar = get_calendar()
+
+        # 과거 지분율 비교 기준일 (30일 전 영업일)
+        prev_date_str = find_past_business_day(actual_date_str, 30, calendar)
+
+        # 기간별 지분율 변동에 필요한 이전 거래일 (로컬 지분율 이력에서 읽음)
+        ownership_history = get_ownership_history(market)
+        past_sessions = history_sessions(calendar, actual_date_str)
+
+    # 2. 필요한 조회를 한 번에 모아 동시 실행 (당일 데이터, 연속 순매수, 3일 평균, 지분율)
+    with stage("fetch"):
+        keys = market_data_keys(actual_date_str, market)
+        # 연속 순매수: 저장된 직전 거래일 상태가 있으면 당일분만 조회
+        streak_plan = plan_streaks(market, actual_date_str, streak_days, streak_investors, calendar)
+        keys += consecutive_keys(market, streak_plan[1], streak_investors)
+        keys += average_keys(market, valid_days)
+        keys.append(("foreign", actual_date_str, market, None))
+        # 지분율 이력: 최근 며칠만 밀렸으면 이어서 적재, 그보다 많이 비었으면 기준 거래일만 조회
+        history_sync, history_points = plan_history(ownership_history, past_sessions, prev_date_str)
+        record_cache("ownership_history", not (history_sync or history_points))
+        keys += [key for d in history_sync + history_points for key in ownership_history.day_keys(d)]
+        report(0.1, f"데이터 수집 중... ({len(set(keys))}건)")
+        extra_tasks = {}
+        if load_master:
+            extra_tasks["ticker_master"] = partial(load_ticker_master, throttle=panel.executor.limiter.acquire)
+        ticker_master = panel.load(keys, extra_tasks).get("ticker_master")
+        frames = panel.frames
+
+    report(0.8, "분석 중...")
+
+    # 3. 당일 데이터 (필터링 및 로직용)
+    with stage("market_data"):
+        df, error = get_market_data(actual_date_str, market, frames)
+        if error:
+            return {"error": error}
+
+    # 4. 3일 평균 데이터 (표시용) - 거래일별 데이터 합계 / 기간 일수
+    with stage("averages"):
+        columns = {}
+        for inv in INVESTORS:
+            columns[f'{inv}_평균'] = panel.daily_sum("net_purchase", valid_days, '순매수거래대금', inv) / len(valid_days)
+        columns['평균등락률'] = panel.daily_sum("ohlcv", valid_days, '등락률') / len(valid_days)
+        df_avgs = pd.DataFrame(columns)
+
+        # 당일 데이터와 평균 데이터 병합
+        df = df.join(df_avgs, how='left').fillna(0)
+
+    # 5. 외국인 지분 변동 (30일, 5/20/60/120 거래일, 추세)
+    with stage("ownership"):
+        ownership_history.sync(history_sync, panel.executor, frames=frames)
+        df_foreign_change = get_foreign_ownership_change(
+            market, actual_date_str, prev_date_str, frames, ownership_history, past_sessions, history_points
+        )
+        if df_foreign_change is not None:
+            df = df.join(df_foreign_change, how='left')
+        for col in ownership_columns():
+            # 지분추세는 계산할 수 없으면 0('추세 없음') 대신 비워 둠
+            fill = float('nan') if col == TREND_COLUMN else 0
+            df[col] = df[col].fillna(fill) if col in df.columns else fill
+
+    # N일 연속 순매수 종목 사전 확보 (필터링용)
+    with stage("streaks"):
+        strict_set, relaxed_set, investor_sets = get_consecutive_tickers_sets(
+            market, actual_date_str, frames, streak_plan, streak_days, streak_investors, min_streak_investors
+        )
+
+    if isinstance(ticker_master, Exception):
+        print(f"종목 마스터 조회 실패: {ticker_master}")
+
+    return {
+        "frame": df,
+        "strict_set": strict_set,
+        "relaxed_set": relaxed_set,
+        "investor_sets": investor_sets,
+        "ticker_master": ticker_master,
+        "actual_date": actual_date_str,
+        "fetch_stats": panel.executor.latency_report(),
+    }
+
+def results_to_frame(results):
+    """
+    analyze_market_v2 결과 리스트를 평탄화한 DataFrame (주체별 금액, 기간별 지분변동은 개별 컬럼)
+    """
+    rows = []
+    for r in results:
+        row = {k: v for k, v in r.items() if k not in ('amounts', 'foreign_diff_windows')}
+        row.update({f'{inv}_평균': amt for inv, amt in r['amounts'].items()})
+        row.update({f'foreign_diff_{w}': diff for w, diff in r.get('foreign_diff_windows', {}).items()})
+        rows.append(row)
+    return pd.DataFrame(rows)
@@ -0,0 +1,147 @@
+"""
+투자자별 연속 순매수 일수 카운터
+
+(종목, 투자자) 별 연속 순매수 일수를 정수 배열로 관리합니다. "N일 이상 연속", "M개 주체 중 K개 이상"
+판정은 배열 비교로 처리하고, 거래일별 상태를 저장해 두면 다음 거래일은 하루치 데이터만 반영하면 됩니다.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import record_cache
+from krx_store import STORE_DIR, atomic_write, is_final
+
+
+class StreakCounter:
+    """
+    tickers: 종목 인덱스, lengths: (종목 수 x 투자자 수) 연속 순매수 일수 배열
+    depth: 누적 반영한 거래일 수 (depth 보다 긴 연속 여부는 판정할 수 없음)
+    """
+    def __init__(self, investors, tickers=None, lengths=None, depth=0):
+        self.investors = list(investors)
+        self.tickers = pd.Index([] if tickers is None else tickers, dtype=object)
+        if lengths is None:
+            lengths = np.zeros((len(self.tickers), len(self.investors)), dtype=np.int32)
+        self.lengths = lengths
+        self.depth = depth
+
+    def update(self, net_purchases):
+        """
+        하루치 반영. net_purchases: {투자자: 순매수거래대금 Series}
+        당일 순매수(> 0) 종목은 전일 연속 일수 + 1, 나머지(미매수/미상장)는 0
+        """
+        series = [net_purchases[inv] for inv in self.investors]
+        today = series[0].index
+        for s in series[1:]:
+            today = today.union(s.index, sort=False)
+
+        prev = np.zeros((len(today), len(self.investors)), dtype=np.int32)
+        pos = self.tickers.get_indexer(today)
+        hit = pos >= 0
+        prev[hit] = self.lengths[pos[hit]]
+
+        buy = np.column_stack([(s.reindex(today) > 0).to_numpy() for s in series])
+        self.lengths = np.where(buy, prev + 1, 0).astype(np.int32)
+        self.tickers = today
+        self.depth += 1
+
+    def at_least(self, n):
+        """
+        (종목 x 투자자) N일 이상 연속 순매수 여부
+        """
+        return self.lengths >= n
+
+    def investor_sets(self, n):
+        """
+        투자자별 N일 이상 연속 순매수 종목 집합
+        """
+        mask = self.at_least(n)
+        return {inv: set(self.tickers[mask[:, j]]) for j, inv in enumerate(self.investors)}
+
+    def tickers_with(self, n, k):
+        """
+        N일 이상 연속 순매수한 투자자가 K개 이상인 종목 집합
+        """
+        return set(self.tickers[self.at_least(n).sum(axis=1) >= k])
+
+    # --- 저장/복원 (투자자별 파일) ---
+
+    def save(self, market, date_str):
+        tickers = np.asarray(self.tickers, dtype=str)
+        for j, inv in enumerate(self.investors):
+            # np.savez 는 .npz 로 끝나지 않는 경로에 확장자를 붙이므로 임시 파일도 .npz
+            with atomic_write(streak_path(market, date_str, inv), suffix=".tmp.npz") as tmp_path:
+                np.savez(tmp_path, tickers=tickers, lengths=self.lengths[:, j], depth=self.depth)
+
+    @classmethod
+    def load(cls, market, date_str, investors):
+        """
+        저장된 상태 복원 (투자자 중 하나라도 없으면 None)
+        """
+        paths = [streak_path(market, date_str, inv) for inv in investors]
+        if not all(os.path.exists(p) for p in paths):
+            return None
+        try:
+            parts = []
+            for path in paths:
+                with np.load(path) as data:
+                    parts.append((pd.Index(data["tickers"].astype(object)), data["lengths"], int(data["depth"])))
+        except Exception as e:
+            print(f"연속 순매수 상태 읽기 실패 ({market} {date_str}): {e}")
+            return None
+
+        tickers = parts[0][0]
+        for index, _, _ in parts[1:]:
+            tickers = tickers.union(index, sort=False)
+        lengths = np.zeros((len(tickers), len(investors)), dtype=np.int32)
+        for j, (index, col, _) in enumerate(parts):
+            lengths[tickers.get_indexer(index), j] = col
+        return cls(investors, tickers, lengths, depth=min(depth for _, _, depth in parts))
+
+
+def streak_path(market, date_str, investor):
+    return os.path.join(STORE_DIR, "streaks", market, investor, f"{date_str}.npz")
+
+def consecutive_sets(counter, n, min_investors=2):
+    """
+    반환값: (strict_set, relaxed_set, 투자자별 집합)
+    strict: 모든 투자자가 N일 이상 연속 순매수, relaxed: min_investors 개 이상 투자자가 N일 이상 연속 순매수
+    """
+    strict_set = counter.tickers_with(n, len(counter.investors))
+    relaxed_set = counter.tickers_with(n, min_investors)
+    return strict_set, relaxed_set, counter.investor_sets(n)
+
+def plan_streaks(market, date_str, window, investors, calendar):
+    """
+    기준일 연속 순매수 상태를 만들기 위한 계획
+    반환: (출발 상태 또는 None, 새로 반영해야 할 거래일 목록)
+    - 기준일 상태가 저장돼 있으면 추가 조회 없음
+    - 직전 거래일 상태가 있으면 기준일 하루치만 반영
+    - 없으면 최근 window 거래일로 새로 계산
+    """
+    counter = StreakCounter.load(market, date_str, investors)
+    if counter is not None and counter.depth >= window:
+        record_cache("streaks", hit=True)
+        return counter, []
+
+    prev_date_str = calendar.offset(date_str, -1)
+    if prev_date_str is not None:
+        counter = StreakCounter.load(market, prev_date_str, investors)
+        if counter is not None and counter.depth >= window - 1:
+            record_cache("streaks", hit=True)
+            return counter, [date_str]
+
+    record_cache("streaks", hit=False)
+    return None, calendar.sessions_up_to(date_str, window)
+
+def advance_streaks(market, date_str, base, daily_net_purchases, investors):
+    """
+    출발 상태에 거래일별 순매수({투자자: Series}, 오래된 날짜부터)를 반영하고, 확정된 날짜면 저장합니다.
+    """
+    counter = base if base is not None else StreakCounter(investors)
+    for net_purchases in daily_net_purchases:
+        counter.update(net_purchases)
+    if daily_net_purchases and is_final(date_str):
+        counter.save(market, date_str)
+    return counter
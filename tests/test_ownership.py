@@ -0,0 +1,66 @@
+"""
+ownership_changes 의 지분추세: 최근 SLOPE_DAYS 거래일이 모두 있을 때만 계산, backfill_ownership 실패 처리
+"""
+import numpy as np
+import pandas as pd
+
+import ownership
+from instrumentation import RunMetrics, activate
+from ownership import SLOPE_DAYS, TREND_COLUMN, ownership_changes
+
+TICKERS = pd.Index(["000010", "000020"], name="티커")
+
+
+class FakeHistory:
+    """
+    시험용: {거래일: [종목별 지분율]} 중 있는 거래일만 값을 돌려주는 이력
+    """
+    def __init__(self, rows):
+        self.rows = rows
+
+    def matrix(self, dates, tickers):
+        return np.array([self.rows.get(d, [np.nan] * len(tickers)) for d in dates], dtype=np.float64)
+
+
+def sessions(n):
+    return [f"2024{i // 28 + 1:02d}{i % 28 + 1:02d}" for i in range(n)]
+
+
+def test_trend_from_full_history():
+    past = sessions(SLOPE_DAYS + 10)
+    # 종목 1: 거래일마다 0.1%p 증가, 종목 2: 변화 없음
+    history = FakeHistory({d: [10 + 0.1 * i, 5.0] for i, d in enumerate(past)})
+    current = pd.Series([10 + 0.1 * len(past), 5.0], index=TICKERS)
+    df = ownership_changes(history, current, past, prev_date_str=past[-1])
+    np.testing.assert_allclose(df[TREND_COLUMN], [0.1, 0.0], atol=1e-9)
+    np.testing.assert_allclose(df["지분변동_5d"], [0.5, 0.0], atol=1e-9)
+
+
+def test_trend_is_blank_with_sparse_points():
+    past = sessions(SLOPE_DAYS + 10)
+    # 빈 이력: 기간별 변동 기준 거래일만 따로 조회한 경우
+    points = {past[-n]: pd.Series([10 - 0.1 * n, 5.0], index=TICKERS) for n in (5, 20)}
+    current = pd.Series([10.0, 5.0], index=TICKERS)
+    df = ownership_changes(FakeHistory({}), current, past, points=points)
+    assert df[TREND_COLUMN].isna().all()
+    np.testing.assert_allclose(df["지분변동_5d"], [0.5, 0.0], atol=1e-9)
+    # 비교 값이 없는 변동은 0
+    assert (df["지분변동"] == 0).all() and (df["지분변동_60d"] == 0).all()
+
+
+def test_trend_is_blank_with_short_history():
+    past = sessions(SLOPE_DAYS - 5)
+    history = FakeHistory({d: [10.0, 5.0] for d in past})
+    df = ownership_changes(history, pd.Series([10.0, 5.0], index=TICKERS), past)
+    assert df[TREND_COLUMN].isna().all()
+
+
+def test_backfill_failure_is_recorded(monkeypatch):
+    def unavailable(date_str):
+        raise ConnectionError("달력 조회 실패")
+
+    monkeypatch.setattr(ownership, "get_calendar", unavailable)
+    metrics = RunMetrics()
+    with activate(metrics):
+        assert ownership.backfill_ownership("KOSPI", "20240105") is None
+    assert [f["name"] for f in metrics.fallbacks] == ["ownership_history"]
@@ -0,0 +1,97 @@
+"""
+PanelStore 적재(append/prepend), 종목 수 증가에 따른 배열 확장, 다른 저장소 객체가 쓴 내용 다시 읽기
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from panel_store import PanelStore
+
+
+class PriceStore(PanelStore):
+    """
+    시험용: 종가/등락률 두 필드만 저장
+    """
+    fields = {"종가": (np.int64, None), "등락률": (np.float32, 2)}
+    listed_field = "종가"
+
+
+def day(tickers, base):
+    """
+    종가 = base + 종목 번호, 등락률 = 종목 번호 / 100 인 한 거래일 표
+    """
+    numbers = np.array([int(t) for t in tickers])
+    return pd.DataFrame({"종가": base + numbers, "등락률": numbers / 100}, index=pd.Index(tickers, name="티커"))
+
+def tickers(start, stop):
+    return [f"{i:06d}" for i in range(start, stop)]
+
+def check_day(store, date_str, frame):
+    stored = store.day_frame(date_str)
+    pd.testing.assert_frame_equal(stored.loc[frame.index], frame.astype(np.float64), check_dtype=False)
+    assert len(stored) == len(frame)
+
+
+def test_append_grows_tickers_past_capacity(tmp_path):
+    store = PriceStore("TEST", root=str(tmp_path))
+    days = [("20240102", day(tickers(0, 3), 1000)), ("20240103", day(tickers(0, 4), 2000))]
+    store.append(days)
+    assert store.ticker_capacity == 4
+
+    # 저장된 행이 있는 상태에서 용량(4)을 넘는 종목이 새로 등장
+    grown = day(tickers(2, 13), 3000)
+    store.append([("20240104", grown)])
+    assert store.ticker_capacity == 16
+    assert len(store.tickers) == 13
+    for date_str, frame in days + [("20240104", grown)]:
+        check_day(store, date_str, frame)
+
+
+def test_prepend_grows_tickers_past_capacity(tmp_path):
+    store = PriceStore("TEST", root=str(tmp_path))
+    later = [("20240104", day(tickers(0, 2), 1000)), ("20240105", day(tickers(0, 2), 2000))]
+    store.append(later)
+
+    earlier = [("20240102", day(tickers(5, 12), 500)), ("20240103", day(tickers(0, 9), 700))]
+    store.prepend(earlier)
+    assert store.dates == ["20240102", "20240103", "20240104", "20240105"]
+    for date_str, frame in earlier + later:
+        check_day(store, date_str, frame)
+
+    with pytest.raises(ValueError):
+        store.prepend([("20240104", day(tickers(0, 1), 0))])
+
+
+def test_failed_append_rolls_back(tmp_path):
+    store = PriceStore("TEST", root=str(tmp_path))
+    store.append([("20240102", day(tickers(0, 2), 1000))])
+
+    bad = day(tickers(0, 6), 2000).astype(object)
+    bad.iloc[3, 0] = "오류"
+    with pytest.raises(ValueError):
+        store.append([("20240103", day(tickers(0, 4), 1500)), ("20240104", bad)])
+    assert store.dates == ["20240102"]
+    assert store.tickers == tickers(0, 2)
+
+    # 실패 후에도 이어서 적재/조회 가능
+    grown = day(tickers(0, 9), 3000)
+    store.append([("20240103", grown)])
+    check_day(store, "20240103", grown)
+    check_day(store, "20240102", day(tickers(0, 2), 1000))
+
+
+def test_reader_reloads_after_other_writer(tmp_path):
+    writer = PriceStore("TEST", root=str(tmp_path))
+    writer.append([("20240102", day(tickers(0, 2), 1000))])
+    reader = PriceStore("TEST", root=str(tmp_path))
+    assert reader.dates == ["20240102"]
+
+    # 다른 객체(다른 프로세스에 해당)가 종목 용량을 늘리며 앞/뒤로 적재
+    writer.append([("20240104", day(tickers(0, 20), 2000))])
+    writer.prepend([("20240101", day(tickers(3, 7), 500))])
+
+    view, dates = reader.window("종가", "20240104", 3)
+    assert dates == ["20240101", "20240102", "20240104"]
+    assert view.shape == (3, 20)
+    check_day(reader, "20240104", day(tickers(0, 20), 2000))
+    check_day(reader, "20240101", day(tickers(3, 7), 500))
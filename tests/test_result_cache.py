@@ -0,0 +1,160 @@
+"""
+ResultCache single-flight/LRU 동작과 analyze_cached 의 진행 표시 콜백 격리
+"""
+import threading
+import time
+
+import pytest
+
+import result_cache
+from result_cache import ResultCache
+
+
+class Interrupt(BaseException):
+    """
+    시험용: Streamlit 재실행 요청(RerunException 등, BaseException 하위 클래스)에 해당
+    """
+
+
+@pytest.fixture(autouse=True)
+def no_history(monkeypatch):
+    # 결과 이력(SQLite) 기록은 이 시험과 무관
+    monkeypatch.setattr(result_cache, "record_results", lambda market, data: None)
+
+
+def wait_for_waiters(cache, n):
+    deadline = time.monotonic() + 5
+    while cache.stats["wait"] < n and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cache.stats["wait"] >= n
+
+
+def run_in_threads(n, target):
+    results, errors = [None] * n, [None] * n
+
+    def worker(i):
+        try:
+            results[i] = target(i)
+        except BaseException as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    return threads, results, errors
+
+
+def test_single_flight_computes_once():
+    cache = ResultCache()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {"value": 1}
+
+    leader, results, _ = run_in_threads(1, lambda i: cache.get_or_compute("k", compute))
+    started.wait(5)
+    followers, follower_results, _ = run_in_threads(3, lambda i: cache.get_or_compute("k", compute))
+    wait_for_waiters(cache, 3)
+    release.set()
+    for t in leader + followers:
+        t.join(5)
+
+    assert len(calls) == 1
+    assert all(r is results[0] for r in follower_results)
+    assert cache.get_or_compute("k", compute) is results[0]
+    assert cache.stats["miss"] == 1 and cache.stats["hit"] == 1
+
+
+def test_lru_eviction_and_should_store():
+    cache = ResultCache(max_entries=2, should_store=lambda result: result != "skip")
+    for key in ("a", "b"):
+        cache.get_or_compute(key, lambda: key)
+    cache.get_or_compute("a", lambda: "new")  # a 를 최근 사용으로
+    cache.get_or_compute("c", lambda: "c")   # 가장 오래된 b 제거
+    assert cache.get_or_compute("a", lambda: "new") == "a"
+    assert cache.get_or_compute("b", lambda: "b2") == "b2"
+
+    assert cache.get_or_compute("d", lambda: "skip") == "skip"
+    assert cache.get_or_compute("d", lambda: "kept") == "kept"
+
+
+def test_error_is_shared_with_waiters():
+    cache = ResultCache()
+    started, release = threading.Event(), threading.Event()
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise ValueError("조회 실패")
+
+    leader, _, leader_errors = run_in_threads(1, lambda i: cache.get_or_compute("k", failing))
+    started.wait(5)
+    followers, _, follower_errors = run_in_threads(2, lambda i: cache.get_or_compute("k", lambda: "unused"))
+    wait_for_waiters(cache, 2)
+    release.set()
+    for t in leader + followers:
+        t.join(5)
+    assert isinstance(leader_errors[0], ValueError)
+    assert all(isinstance(e, ValueError) for e in follower_errors)
+
+
+def test_interrupted_leader_hands_over_to_waiter():
+    cache = ResultCache()
+    started, release = threading.Event(), threading.Event()
+
+    def interrupted():
+        started.set()
+        release.wait(5)
+        raise Interrupt()
+
+    leader, _, leader_errors = run_in_threads(1, lambda i: cache.get_or_compute("k", interrupted))
+    started.wait(5)
+    followers, results, errors = run_in_threads(2, lambda i: cache.get_or_compute("k", lambda: {"value": 2}))
+    wait_for_waiters(cache, 2)
+    release.set()
+    for t in leader + followers:
+        t.join(5)
+
+    assert isinstance(leader_errors[0], Interrupt)
+    assert errors == [None, None]
+    assert results[0] == {"value": 2} and results[0] is results[1]
+
+
+def test_progress_exception_stays_in_leader_session(monkeypatch):
+    cache = ResultCache()
+    monkeypatch.setattr(result_cache, "_results", cache)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def fake_analyze(market, date_str, progress=None, **kwargs):
+        calls.append(market)
+        progress(0.1, "조회 중")
+        started.set()
+        release.wait(5)
+        progress(0.9, "분석 중")
+        return {"results": [], "actual_date": date_str}
+
+    monkeypatch.setattr(result_cache, "analyze_market_v2", fake_analyze)
+
+    def leader_progress(fraction, message):
+        raise Interrupt()
+
+    leader, _, leader_errors = run_in_threads(
+        1, lambda i: result_cache.analyze_cached("KOSPI", "20240105", progress=leader_progress)
+    )
+    started.wait(5)
+    followers, results, errors = run_in_threads(1, lambda i: result_cache.analyze_cached("KOSPI", "20240105"))
+    wait_for_waiters(cache, 1)
+    release.set()
+    for t in leader + followers:
+        t.join(5)
+
+    assert isinstance(leader_errors[0], Interrupt)
+    assert errors == [None]
+    assert results[0] == {"results": [], "actual_date": "20240105"}
+    assert calls == ["KOSPI"]
+
@@ -0,0 +1,200 @@
+"""
+score_market(벡터화 채점)이 기존 종목별 iterrows 루프와 같은 순위 결과를 내는지 확인
+
+reference_loop 는 원래 app_v2.analyze_market_v2 의 채점 루프를 그대로 옮긴 것입니다
+(진행 표시/종목명 조회만 제외, 고정 기준값은 ScoringParams 필드로 치환).
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from scoring import DEFAULT_SCORING, ScoringParams, score_market, to_results
+
+EOK = 100000000
+
+
+def synthetic_frame(n=2000, seed=0):
+    """
+    기준값과 정확히 같은 값(경계)이 자주 나오도록 만든 당일/평균 병합 표
+    금액은 절반을 기준값 격자에서, 나머지는 억 단위로 반올림한 정규분포에서 뽑아 동점도 만듦
+    """
+    rng = np.random.default_rng(seed)
+    tickers = [f"{i:06d}" for i in range(100, 100 + n)]
+    grid = np.array([-20, -10, -1, 0, 1, 5, 10, 20, 30, 50], dtype=float)
+
+    def amounts(scale):
+        continuous = np.round(rng.normal(0.5, 1.5, n) * scale / EOK)
+        return np.where(rng.random(n) < 0.5, rng.choice(grid, n), continuous) * EOK
+
+    market_cap = rng.integers(50, 5000, n).astype(float) * EOK
+    fin_invest = amounts(5 * EOK)
+    # 일부 종목은 금융투자 순매도가 시총 대비 한도와 정확히 같음
+    at_limit = rng.random(n) < 0.1
+    fin_invest[at_limit] = -(market_cap[at_limit] * DEFAULT_SCORING.fin_invest_sell_ratio)
+    fluctuation = np.where(rng.random(n) < 0.1, rng.choice([10.0, 15.0], n), np.round(rng.normal(3, 8, n), 2))
+
+    df = pd.DataFrame({
+        '시가총액': market_cap,
+        '등락률': fluctuation,
+        '외국인_순매수': amounts(30 * EOK),
+        '금융투자_순매수': fin_invest,
+        '투신_순매수': amounts(15 * EOK),
+        '연기금_순매수': amounts(15 * EOK),
+        '프로그램_순매수': rng.choice([-1.0, 0.0, 1.0], n) * rng.integers(0, 20, n) * EOK,
+        '외국인_평균': amounts(30 * EOK),
+        '금융투자_평균': amounts(5 * EOK),
+        '투신_평균': amounts(15 * EOK),
+        '연기금_평균': amounts(15 * EOK),
+        '평균등락률': np.round(rng.normal(2, 5, n), 2),
+        '지분변동': np.round(rng.normal(0, 1, n), 2),
+    }, index=pd.Index(tickers, name='티커'))
+    # 일부 종목은 3주체 평균 합계가 하한(10억)과 정확히 같음
+    at_min = rng.random(n) < 0.15
+    df.loc[at_min, ['외국인_평균', '투신_평균', '연기금_평균']] = [5 * EOK, 3 * EOK, 2 * EOK]
+
+    def subset(p):
+        return set(df.index[rng.random(n) < p])
+
+    set_for, set_trust, set_pension = subset(0.4), subset(0.4), subset(0.4)
+    strict_set = set_for & set_trust & set_pension
+    relaxed_set = (set_for & set_trust) | (set_for & set_pension) | (set_trust & set_pension)
+    return df, strict_set, relaxed_set, set_for, set_trust, set_pension
+
+
+def reference_loop(df, strict_set, relaxed_set, set_for, set_trust, set_pension, params=DEFAULT_SCORING):
+    results = []
+
+    df = df.copy()
+    df['주요수급합계'] = df['외국인_순매수'] + df['투신_순매수'] + df['연기금_순매수']
+    df['수급비중'] = df['주요수급합계'] / df['시가총액']
+    top_ratio_tickers = df.sort_values(by='수급비중', ascending=False).head(params.bonus_top_n).index.tolist()
+
+    for ticker, row in df.iterrows():
+        market_cap = row['시가총액']
+        fluctuation = row['등락률']
+
+        prog_buy = row['프로그램_순매수']
+        for_buy = row['외국인_순매수']
+        inv_trust_buy = row['투신_순매수']
+        pension_buy = row['연기금_순매수']
+
+        if fluctuation >= params.max_fluctuation:
+            continue
+
+        if row['금융투자_순매수'] < -(market_cap * params.fin_invest_sell_ratio):
+            continue
+
+        is_priority_1 = (
+            (prog_buy < 0) and
+            (for_buy >= params.foreign_amount) and
+            (inv_trust_buy >= params.trust_amount) and
+            (pension_buy >= params.pension_amount)
+        )
+
+        if not is_priority_1 and (ticker not in relaxed_set):
+            continue
+
+        is_strict = ticker in strict_set
+
+        score = 0
+        priority_type = "None"
+        reasons = []
+
+        if is_priority_1:
+            score += 100
+            priority_type = "1순위"
+            reasons.append("프로그램 매도세 극복")
+        elif is_strict and (for_buy > 0) and (inv_trust_buy > 0) and (pension_buy > 0):
+            score += 70
+            priority_type = "2순위"
+            reasons.append("외인/투신/연기금 동반 매수")
+        else:
+            buy_count = 0
+            if for_buy > 0: buy_count += 1
+            if inv_trust_buy > 0: buy_count += 1
+            if pension_buy > 0: buy_count += 1
+
+            if buy_count >= 2:
+                pass_filter = True
+
+                consecutive_entities = []
+                if ticker in set_for: consecutive_entities.append('외국인')
+                if ticker in set_trust: consecutive_entities.append('투신')
+                if ticker in set_pension: consecutive_entities.append('연기금')
+
+                for entity in consecutive_entities:
+                    avg_amt = row[f'{entity}_평균']
+                    if entity == '외국인':
+                        if avg_amt < params.foreign_amount:
+                            pass_filter = False
+                            break
+                    elif entity == '투신':
+                        if avg_amt < params.trust_amount:
+                            pass_filter = False
+                            break
+                    elif entity == '연기금':
+                        if avg_amt < params.pension_amount:
+                            pass_filter = False
+                            break
+
+                if pass_filter:
+                    score += 40
+                    priority_type = "3순위"
+                    reasons.append(f"주요 주체 {buy_count}곳 매수")
+
+        if score == 0:
+            continue
+
+        if ticker in top_ratio_tickers:
+            score += params.bonus_score
+            reasons.append("수급비중 상위")
+
+        avg_sum = row['외국인_평균'] + row['투신_평균'] + row['연기금_평균']
+
+        if avg_sum < params.min_avg_sum:
+            continue
+
+        if (row['외국인_평균'] < 0) or (row['투신_평균'] < 0) or (row['연기금_평균'] < 0):
+            continue
+
+        results.append({
+            'ticker': ticker,
+            'name': ticker,
+            'score': score,
+            'priority': priority_type,
+            'fluctuation': row['평균등락률'],
+            'market_cap': market_cap,
+            'reasons': ", ".join(reasons),
+            'total_avg': avg_sum,
+            'amounts': {
+                '외국인': row['외국인_평균'],
+                '투신': row['투신_평균'],
+                '연기금': row['연기금_평균'],
+                '금융투자': row['금융투자_평균']
+            },
+            'is_strict': is_strict,
+            'foreign_diff': row['지분변동']
+        })
+
+    results.sort(key=lambda x: (x['priority'], -x['score'], -x['total_avg']))
+    return results
+
+
+def vectorized(df, strict_set, relaxed_set, set_for, set_trust, set_pension, params=DEFAULT_SCORING):
+    scored = score_market(df, strict_set, relaxed_set, set_for, set_trust, set_pension, params)
+    results = to_results(scored.assign(name=scored.index))
+    # 기존 루프에 없던 필드 (지분율 기간별 변동/추세) 는 비교에서 제외
+    return [{k: v for k, v in r.items() if k not in ('foreign_diff_windows', 'foreign_trend')} for r in results]
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize("params", [
+    DEFAULT_SCORING,
+    ScoringParams(max_fluctuation=10.0, foreign_amount=10 * EOK, bonus_top_n=20, bonus_score=5, min_avg_sum=0),
+])
+def test_score_market_matches_reference_loop(seed, params):
+    inputs = synthetic_frame(seed=seed)
+    expected = reference_loop(*inputs, params=params)
+    assert expected, "합성 데이터에서 통과 종목이 없으면 비교 의미가 없음"
+    assert {r['priority'] for r in expected} == {"1순위", "2순위", "3순위"}
+    assert vectorized(*inputs, params=params) == expected
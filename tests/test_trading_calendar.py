@@ -0,0 +1,80 @@
+"""
+TradingCalendar.ensure: 빈/일부만 받은 응답을 확정 구간으로 저장하지 않는지 확인
+"""
+import os
+
+import pandas as pd
+import pytest
+
+import trading_calendar
+from trading_calendar import TradingCalendar
+
+# 2024-01-01(월) 신정 휴장, 01-06/07 주말
+SESSIONS = ["20231228", "20231229", "20240102", "20240103", "20240104", "20240105", "20240108", "20240109"]
+
+
+@pytest.fixture
+def source(monkeypatch):
+    """
+    SESSIONS 로 응답하는 가짜 일봉 조회 (empty=True 면 빈 응답, 호출 구간 기록)
+    """
+    state = {"empty": False, "calls": []}
+
+    def fake_fetch(method, start, end, ticker):
+        state["calls"].append((start, end))
+        days = [] if state["empty"] else [d for d in SESSIONS if start <= d <= end]
+        return pd.DataFrame({"종가": range(len(days))}, index=pd.to_datetime(days, format="%Y%m%d"))
+
+    monkeypatch.setattr(trading_calendar, "fetch", fake_fetch)
+    return state
+
+
+def test_empty_first_response_is_not_saved(tmp_path, source):
+    path = str(tmp_path / "sessions.json")
+    source["empty"] = True
+    calendar = TradingCalendar(path)
+    calendar.ensure("20240105", start_date="20231201")
+    assert calendar.sessions == []
+    assert calendar.end is None
+    assert not os.path.exists(path)
+
+    # 소스가 복구되면 다음 호출에서 다시 조회
+    source["empty"] = False
+    calendar.ensure("20240105", start_date="20231201")
+    assert calendar.sessions == SESSIONS[:6]
+    assert TradingCalendar(path).end == "20240105"
+
+
+def test_empty_extension_keeps_end(tmp_path, source):
+    path = str(tmp_path / "sessions.json")
+    calendar = TradingCalendar(path)
+    calendar.ensure("20240103", start_date="20231201")
+    assert calendar.end == "20240103"
+
+    source["empty"] = True
+    calendar.ensure("20240109")
+    assert calendar.end == "20240103"
+    assert TradingCalendar(path).end == "20240103"
+
+    source["empty"] = False
+    calendar._tail = None
+    calendar.ensure("20240109")
+    assert calendar.end == "20240109"
+    assert calendar.sessions == SESSIONS[:8]
+
+
+def test_weekend_is_confirmed_but_weekday_holiday_waits(tmp_path, source):
+    calendar = TradingCalendar(str(tmp_path / "sessions.json"))
+    # 금요일까지 받았으면 주말(일요일)까지 확정
+    calendar.ensure("20240107", start_date="20231201")
+    assert calendar.end == "20240107"
+    assert calendar.session_on_or_before("20240107") == "20240105"
+
+    # 평일(신정) 휴장으로 끝나는 구간은 받은 마지막 거래일까지만 확정
+    other = TradingCalendar(str(tmp_path / "other.json"))
+    other.ensure("20240101", start_date="20231201")
+    assert other.end == "20231229"
+    other._tail = None
+    other.ensure("20240102")
+    assert other.end == "20240102"
+    assert other.sessions == SESSIONS[:3]
@@ -0,0 +1,73 @@
+"""
+종목 마스터 (티커, 종목명, 시장, 상장일)
+
+상장/상장폐지 종목 목록을 거래일마다 한 번 일괄 조회해 로컬에 저장하고,
+종목명 조회는 종목별 pykrx 호출 대신 한 번의 병합(join)으로 처리합니다.
+"""
+import os
+import threading
+from datetime import datetime
+
+from datasource import fetch
+from instrumentation import record_cache
+from krx_store import STORE_DIR, read_frame, write_frame
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def fetch_ticker_master():
+    """
+    종목 마스터 일괄 조회 (티커 인덱스, 종목/ISIN/시장/상장폐지/상장일 컬럼)
+    """
+    return fetch("ticker_master")
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
+
+def master_path(date_str):
+    return os.path.join(STORE_DIR, "ticker_master", f"{date_str}.parquet")
+
+def load_ticker_master(date_str=None, throttle=None):
+    """
+    거래일 단위로 한 번만 조회하는 종목 마스터 (메모리 -> 디스크 -> pykrx 순)
+    """
+    if date_str is None:
+        date_str = datetime.now().strftime("%Y%m%d")
+
+    with _lock:
+        if date_str in _cache:
+            record_cache("ticker_master", hit=True)
+            return _cache[date_str]
+
+        path = master_path(date_str)
+        master = read_frame(path) if os.path.exists(path) else None
+        record_cache("ticker_master", hit=master is not None)
+        if master is None:
+            if throttle is not None:
+                throttle()
+            master = fetch_ticker_master()
+            write_frame(path, master)
+
+        _cache.clear()
+        _cache[date_str] = master
+        return master
+
+def attach_names(df, master, memo=None):
+    """
+    df 에 종목명(name) 컬럼을 병합합니다 (master 가 None 이면 모두 개별 조회).
+    마스터에 없는 종목(당일 신규 상장 등)만 개별 조회하며, memo(dict)가 주어지면 조회한 이름을 재사용합니다.
+    """
+    if master is None:
+        df = df.assign(name=None)
+    else:
+        df = df.join(master["종목"].rename("name"), how="left")
+    memo = {} if memo is None else memo
+    missing = df["name"].isna()
+    if missing.any():
+        for ticker in df.index[missing]:
+            if ticker not in memo:
+                memo[ticker] = fetch("get_market_ticker_name", ticker)
+        df.loc[missing, "name"] = [memo[ticker] for ticker in df.index[missing]]
+    return df
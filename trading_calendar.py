@@ -0,0 +1,213 @@
+"""
+로컬 거래일 달력
+
+삼성전자(005930) 일봉 인덱스로 거래일 목록을 한 번 만들어 로컬에 저장하고,
+이후에는 새로 필요한 구간만 덧붙여 갱신합니다. 조회는 네트워크 없이 이진 탐색으로 처리합니다.
+"""
+import bisect
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from datasource import fetch
+from instrumentation import record_cache
+from krx_store import STORE_DIR, atomic_write
+
+CALENDAR_PATH = os.path.join(STORE_DIR, "calendar", "sessions.json")
+DEFAULT_START = "20100101"
+REFERENCE_TICKER = "005930"
+TAIL_TTL = float(os.environ.get("KRX_CALENDAR_TAIL_TTL", "600"))  # 미확정 구간(오늘) 조회 결과 재사용 시간 (초)
+
+
+def _shift(date_str, days):
+    dt = datetime.strptime(date_str, "%Y%m%d") + timedelta(days=days)
+    return dt.strftime("%Y%m%d")
+
+def _last_weekday(date_str):
+    dt = datetime.strptime(date_str, "%Y%m%d")
+    while dt.weekday() >= 5:
+        dt -= timedelta(days=1)
+    return dt.strftime("%Y%m%d")
+
+def _confirmed_end(fetched, start, target):
+    """
+    start ~ target 조회 결과로 확정할 수 있는 마지막 날짜 (없으면 None)
+    target 이전 마지막 평일까지 받았으면(구간에 평일이 없으면) target, 아니면 받은 마지막 거래일까지만
+    (평일 휴장일이거나 빈/잘린 응답일 수 있으므로 나머지는 다음 조회에서 다시 확인)
+    """
+    got = [d for d in fetched if d <= target]
+    expected = _last_weekday(target)
+    if expected < start or (got and got[-1] >= expected):
+        return target
+    return got[-1] if got else None
+
+
+class TradingCalendar:
+    """
+    거래일 목록 (YYYYMMDD 문자열, 오름차순)
+    start ~ end 구간은 확정된 구간으로, 다시 조회하지 않습니다.
+    end 는 조회로 확인된 거래일까지만 늘립니다 (빈 응답이나 잘린 응답을 확정 구간으로 저장하지 않음).
+    end 이후의 미확정 구간(오늘)은 조회 결과를 메모리에만 두고 TAIL_TTL 동안 재사용합니다.
+    """
+    def __init__(self, path=CALENDAR_PATH):
+        self.path = path
+        self.sessions = []
+        self._session_set = set()
+        self.start = None
+        self.end = None
+        self._tail = None  # (미확정 구간을 조회한 마지막 날짜, 조회 시각)
+        self._lock = threading.RLock()
+        self._load()
+
+    # --- 저장/복원 ---
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            self._set_sessions(data["sessions"])
+            self.start, self.end = data["start"], data["end"]
+        except Exception as e:
+            print(f"거래일 달력 읽기 실패 ({self.path}): {e}")
+
+    def _save(self):
+        with atomic_write(self.path) as tmp_path:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"start": self.start, "end": self.end, "sessions": self.sessions}, f)
+
+    def _set_sessions(self, sessions):
+        self.sessions = sorted(set(sessions))
+        self._session_set = set(self.sessions)
+
+    # --- 갱신 ---
+
+    def _fetch(self, start, end, throttle=None):
+        if throttle is not None:
+            throttle()
+        df = fetch("get_market_ohlcv_by_date", start, end, REFERENCE_TICKER)
+        return df.index.strftime("%Y%m%d").tolist()
+
+    def ensure(self, end_date, start_date=None, throttle=None):
+        """
+        start_date ~ end_date 구간의 거래일을 확보합니다 (부족한 구간만 조회).
+        오늘 이후 날짜는 아직 확정되지 않았으므로 확정 구간에 포함하지 않습니다.
+        """
+        today = datetime.now().strftime("%Y%m%d")
+        with self._lock:
+            if self.start is None:
+                start = start_date or min(DEFAULT_START, end_date)
+                fetched = self._fetch(start, end_date, throttle)
+                self._set_sessions(fetched)
+                self._tail = (end_date, time.monotonic())
+                record_cache("calendar", hit=False)
+                end = _confirmed_end(fetched, start, min(end_date, _shift(today, -1)))
+                if end is None:
+                    # 빈 응답은 메모리에서만 사용 (다음 실행에서 다시 조회)
+                    print(f"거래일 달력 조회 결과 없음 ({start}~{end_date}), 저장하지 않음")
+                    return
+                self.start, self.end = start, end
+                self._save()
+                return
+
+            changed = False
+            if start_date is not None and start_date < self.start:
+                fetched = self._fetch(start_date, _shift(self.start, -1), throttle)
+                if fetched:
+                    self._set_sessions(self.sessions + fetched)
+                    self.start = start_date
+                    changed = True
+
+            if end_date > self.end and not self._tail_fresh(end_date):
+                fetched = self._fetch(_shift(self.end, 1), end_date, throttle)
+                # 미확정 구간(오늘 포함)의 기존 거래일은 새 조회 결과로 대체
+                confirmed = [d for d in self.sessions if d <= self.end]
+                self._set_sessions(confirmed + fetched)
+                self._tail = (end_date, time.monotonic())
+                # 확정 구간은 조회로 확인된 날짜까지만 늘림 (빈 응답이면 그대로 두고 다음에 다시 조회)
+                new_end = _confirmed_end(fetched, _shift(self.end, 1), min(end_date, _shift(today, -1)))
+                if new_end is not None and new_end > self.end:
+                    self.end = new_end
+                    changed = True
+
+            if changed:
+                self._save()
+            record_cache("calendar", hit=not changed)
+
+    def _tail_fresh(self, end_date):
+        # end_date 까지의 미확정 구간을 최근 TAIL_TTL 초 안에 이미 조회했는지
+        return (
+            self._tail is not None and self._tail[0] >= end_date
+            and time.monotonic() - self._tail[1] < TAIL_TTL
+        )
+
+    # --- 조회 (네트워크 없음) ---
+
+    def is_session(self, date_str):
+        return date_str in self._session_set
+
+    def sessions_up_to(self, date_str, n):
+        """
+        date_str 이하의 최근 N개 거래일 (오름차순)
+        """
+        idx = bisect.bisect_right(self.sessions, date_str)
+        return self.sessions[max(0, idx - n):idx]
+
+    def sessions_between(self, start_date, end_date):
+        lo = bisect.bisect_left(self.sessions, start_date)
+        hi = bisect.bisect_right(self.sessions, end_date)
+        return self.sessions[lo:hi]
+
+    def session_on_or_before(self, date_str):
+        idx = bisect.bisect_right(self.sessions, date_str)
+        return self.sessions[idx - 1] if idx > 0 else None
+
+    def session_days_before(self, date_str, days, max_gap=10):
+        """
+        date_str 로부터 N일 전 시점의 가장 가까운 이전 거래일 (max_gap 일 이내에 없으면 None)
+        """
+        target = _shift(date_str, -days)
+        session = self.session_on_or_before(target)
+        if session is None or session < _shift(target, -max_gap):
+            return None
+        return session
+
+    def offset(self, date_str, n):
+        """
+        date_str 거래일로부터 N 거래일 뒤(음수면 앞) 거래일 (범위 밖이면 None)
+        """
+        idx = bisect.bisect_left(self.sessions, date_str)
+        if idx >= len(self.sessions) or self.sessions[idx] != date_str:
+            return None
+        target = idx + n
+        if target < 0 or target >= len(self.sessions):
+            return None
+        return self.sessions[target]
+
+
+_calendar = None
+_calendar_lock = threading.Lock()
+
+
+def get_calendar(end_date=None, start_date=None, throttle=None):
+    """
+    프로세스 공용 거래일 달력 (end_date 가 주어지면 그 날짜까지 확보)
+    """
+    global _calendar
+    with _calendar_lock:
+        if _calendar is None:
+            _calendar = TradingCalendar()
+    if end_date is not None:
+        _calendar.ensure(end_date, start_date, throttle)
+    return _calendar
+
+def reset_calendar():
+    """
+    메모리에 올라온 달력을 버립니다 (다음 get_calendar 에서 디스크에서 다시 읽음)
+    """
+    global _calendar
+    with _calendar_lock:
+        _calendar = None